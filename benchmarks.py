@@ -0,0 +1,256 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC <opensource@civichacker.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Benchmark schemamodels against jsonschema's Draft 2020-12 validator.
+
+    python benchmarks.py run -o results.json
+    python benchmarks.py run --quick --compare baseline.json
+    python benchmarks.py compare baseline.json results.json
+"""
+
+from argparse import ArgumentParser
+from importlib.metadata import version
+from random import Random
+from time import perf_counter
+import gc
+import json
+import platform
+import sys
+import tracemalloc
+
+from jsonschema import Draft202012Validator
+
+from schemamodels import SchemaModelFactory, ModelCache, exceptions
+
+
+BASE_SHAPE = {'fields': 8, 'enum': 8, 'depth': 0, 'branches': 0, 'invalid': 0.0}
+
+AXES = {
+    'fields': (1, 8, 32, 128),
+    'enum': (2, 64, 1024),
+    'depth': (1, 3),
+    'branches': (2, 8, 32),
+    'invalid': (0.1, 0.5),
+}
+
+# timings and memory where lower is better; anything else in a result is informational
+METRICS = ('register', 'construct', 'todict', 'tocsv', 'peak_bytes', 'compile', 'validate')
+
+
+def shape_name(shape: dict) -> str:
+    return '-'.join(f'{k}{v}' for k, v in shape.items())
+
+
+def field_schema(i: int) -> dict:
+    return (
+        {'type': 'integer', 'minimum': 0, 'maximum': 1000},
+        {'type': 'string', 'maxLength': 32},
+        {'type': 'number', 'exclusiveMinimum': 0},
+        {'type': 'boolean'},
+    )[i % 4]
+
+
+def object_schema(shape: dict, depth: int) -> dict:
+    properties = {f'field_{i}': field_schema(i) for i in range(shape['fields'])}
+    properties['category'] = {'type': 'string', 'enum': [f'c{i}' for i in range(shape['enum'])]}
+    if shape['branches']:
+        branches = [{'type': 'integer', 'minimum': 10 * i, 'maximum': 10 * i + 5} for i in range(shape['branches'])]
+        properties['any_branch'] = {'type': 'integer', 'anyOf': branches}
+        properties['one_branch'] = {'type': 'integer', 'oneOf': branches}
+    if depth:
+        properties['child'] = {**object_schema(shape, depth - 1), 'title': f'child-{depth}'}
+    return {'type': 'object', 'required': list(properties), 'properties': properties}
+
+
+def synthetic_schema(shape: dict) -> dict:
+    return {
+        '$schema': 'https://json-schema.org/draft/2020-12/schema',
+        'title': f'bench-{shape_name(shape)}',
+        **object_schema(shape, shape['depth']),
+    }
+
+
+def field_value(i: int, rng: Random):
+    return (rng.randint(0, 1000), f's{rng.randint(0, 1 << 20)}', rng.random() + 0.5, rng.random() < 0.5)[i % 4]
+
+
+def synthetic_record(shape: dict, depth: int, rng: Random) -> dict:
+    record = {f'field_{i}': field_value(i, rng) for i in range(shape['fields'])}
+    record['category'] = f'c{rng.randrange(shape["enum"])}'
+    if shape['branches']:
+        record['any_branch'] = record['one_branch'] = 10 * rng.randrange(shape['branches']) + rng.randint(0, 5)
+    if depth:
+        record['child'] = synthetic_record(shape, depth - 1, rng)
+    return record
+
+
+def invalidate(record: dict, rng: Random) -> dict:
+    while isinstance(record.get('child'), dict) and rng.random() < 0.5:
+        record = record['child']
+    name = rng.choice([k for k in record if k != 'child'])
+    record[name] = {'category': 'not-a-category', 'any_branch': -1, 'one_branch': -1}.get(name, [])
+    return record
+
+
+def synthetic_records(shape: dict, n: int, seed: int) -> list:
+    rng = Random(seed)
+    records = [synthetic_record(shape, shape['depth'], rng) for _ in range(n)]
+    for record in rng.sample(records, int(n * shape['invalid'])):
+        invalidate(record, rng)
+    return records
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    timings = list()
+    for _ in range(repeat):
+        gc.collect()
+        start = perf_counter()
+        fn(*args)
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def peak_bytes(fn, *args) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def construct_all(klass, records: list) -> list:
+    instances = list()
+    for record in records:
+        try:
+            instances.append(klass(**record))
+        except (exceptions.SchemaViolation, TypeError):
+            pass
+    return instances
+
+
+def register(schema: dict):
+    return SchemaModelFactory(cache=ModelCache()).register(schema)
+
+
+def bench_schemamodels(schema: dict, records: list, repeat: int) -> dict:
+    register_time = best_of(repeat, register, schema)
+    sm = SchemaModelFactory(cache=ModelCache())
+    sm.register(schema)
+    klass = sm.get(schema['title'])
+    instances = construct_all(klass, records)
+    return {
+        'register': register_time,
+        'construct': best_of(repeat, construct_all, klass, records),
+        'todict': best_of(repeat, lambda: [i.todict() for i in instances]),
+        'tocsv': best_of(repeat, lambda: [i.tocsv() for i in instances]),
+        'peak_bytes': peak_bytes(construct_all, klass, records),
+        'accepted': len(instances),
+    }
+
+
+def bench_jsonschema(schema: dict, records: list, repeat: int) -> dict:
+    validator = Draft202012Validator(schema)
+    validate = lambda: [r for r in records if validator.is_valid(r)]  # noqa: E731
+    return {
+        'compile': best_of(repeat, Draft202012Validator, schema),
+        'validate': best_of(repeat, validate),
+        'peak_bytes': peak_bytes(validate),
+        'accepted': len(validate()),
+    }
+
+
+def shapes(quick: bool):
+    yield dict(BASE_SHAPE)
+    for axis, values in AXES.items():
+        for value in values[:2] if quick else values:
+            if value != BASE_SHAPE[axis]:
+                yield {**BASE_SHAPE, axis: value}
+
+
+def run(records: int, repeat: int, seed: int, quick: bool, log=sys.stderr) -> dict:
+    results = dict()
+    for shape in shapes(quick):
+        schema, data = synthetic_schema(shape), synthetic_records(shape, records, seed)
+        results[shape_name(shape)] = {
+            'shape': shape,
+            'records': records,
+            'schemamodels': bench_schemamodels(schema, data, repeat),
+            'jsonschema': bench_jsonschema(schema, data, repeat),
+        }
+        sm, js = results[shape_name(shape)]['schemamodels'], results[shape_name(shape)]['jsonschema']
+        print(f'{shape_name(shape):<48} construct {sm["construct"]:.4f}s  jsonschema {js["validate"]:.4f}s', file=log)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'schemamodels': version('schemamodels') if has_distribution('schemamodels') else None,
+            'jsonschema': version('jsonschema'),
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def has_distribution(name: str) -> bool:
+    try:
+        return bool(version(name))
+    except Exception:
+        return False
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    regressions = list()
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name, {}).get('schemamodels', {})
+        for metric, value in result['schemamodels'].items():
+            if metric in METRICS and before.get(metric) and value > before[metric] * (1 + threshold):
+                regressions.append((name, metric, before[metric], value))
+    return regressions
+
+
+def report(regressions: list, threshold: float, log=sys.stderr) -> int:
+    for name, metric, before, after in regressions:
+        print(f'REGRESSION {name} {metric}: {before:.6g} -> {after:.6g} (+{after / before - 1:.0%})', file=log)
+    if not regressions:
+        print(f'no regressions above {threshold:.0%}', file=log)
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    runner = commands.add_parser('run', help='run the suite and write JSON results')
+    runner.add_argument('-o', '--output', help='write results here instead of stdout')
+    runner.add_argument('-n', '--records', type=int, default=2000)
+    runner.add_argument('-r', '--repeat', type=int, default=5)
+    runner.add_argument('--seed', type=int, default=0)
+    runner.add_argument('--quick', action='store_true', help='fewer shapes along each axis')
+    runner.add_argument('--compare', help='baseline results to check for regressions')
+    runner.add_argument('--threshold', type=float, default=0.2)
+    comparer = commands.add_parser('compare', help='compare two result files')
+    comparer.add_argument('baseline')
+    comparer.add_argument('current')
+    comparer.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        with open(args.baseline) as a, open(args.current) as b:
+            return report(compare(json.load(a), json.load(b), args.threshold), args.threshold)
+
+    results = run(args.records, args.repeat, args.seed, args.quick)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+    if args.compare:
+        with open(args.compare) as fp:
+            return report(compare(json.load(fp), results, args.threshold), args.threshold)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,17 +2,33 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import sys
-from dataclasses import make_dataclass, field, fields as fs, asdict, Field
+from dataclasses import make_dataclass, field, asdict, astuple, Field
 from dataclasses import MISSING
 from re import sub
+from pathlib import Path
+import csv
 import importlib
-from operator import gt, ge, lt, le, mod, xor, not_, contains
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import linecache
+from math import isfinite
+from operator import gt, ge, lt, le, mod, not_, contains, attrgetter
 from typing import Callable
-from collections import deque
+from collections import deque, OrderedDict, namedtuple
+from hashlib import sha256
+from threading import Lock
+from itertools import count, islice
 
-from functools import partial, reduce
+from functools import lru_cache, partial
 
-from schemamodels import exceptions as e, bases
+from schemamodels import exceptions as e, arrays, bases, columnar, combinators, packed, streaming
+from schemamodels.formats import FORMAT_CHECKERS, compile_pattern, pattern_matcher
+from schemamodels.resolver import Resolver, as_uri, merge_subschema
+from schemamodels.metrics import Metrics
+from schemamodels.batch import batch_class
+from schemamodels.interning import INTERN_TABLE
 
 
 DEFAULT_FACTORIES = {
@@ -24,7 +40,8 @@ DEFAULT_FACTORIES = {
     'not': callable,
     'anyof': callable,
     'allof': callable,
-    'array': list,
+    'array': tuple,
+    'object': dict,
 }
 
 
@@ -35,6 +52,7 @@ JSON_TYPE_MAP = {
     'null': lambda d: d is None,
     'boolean': lambda d: isinstance(d, bool),
     'array': lambda d: isinstance(d, (list, tuple)),
+    'object': lambda d: isinstance(d, dict),
 }
 
 PORCELINE_KEYWORDS = ['value', 'default', 'anyOf', 'allOf', 'oneOf', 'not', 'description']
@@ -58,7 +76,14 @@ COMPARISONS = {
     'enum': lambda d: partial(contains, d),
     'maxLength': lambda d: partial(lambda bound, v: len(v) <= bound, d),
     'minLength': lambda d: partial(lambda bound, v: len(v) >= bound, d),
-    'multipleOf': lambda d: partial(lambda d, n: mod(n, d) == 0, d)
+    'multipleOf': lambda d: partial(lambda d, n: mod(n, d) == 0, d),
+    'pattern': lambda d: partial(lambda match, v: not isinstance(v, str) or match(v) is not None, pattern_matcher(d)),
+    'format': lambda d: partial(lambda check, v: not isinstance(v, str) or check(v), FORMAT_CHECKERS.get(d, bool)),
+    'maxItems': lambda d: partial(lambda bound, v: len(v) <= bound, d),
+    'minItems': lambda d: partial(lambda bound, v: len(v) >= bound, d),
+    'uniqueItems': lambda d: arrays.unique_items if d else bool,
+    'items': lambda d: compile_predicate({'items': d}),
+    'prefixItems': lambda d: compile_predicate({'prefixItems': d}),
 }
 
 
@@ -84,71 +109,766 @@ def generate_functors(struct):
     return {k: COMPARISONS[k](v) for k, v in struct.items() if k not in PORCELINE_KEYWORDS}
 
 
-def process_functors(nodes):
-    t = list()
-    for node in nodes:
-        for k, v in node['metadata'].items():
-            if k == 'anyOf':
-                ans_list = v(node["value"])
-                t.append({k: any([all(m.values()) for m in ans_list])})
-            elif k == 'allOf':
-                ans_list = v(node["value"])
-                t.append({k: all(all(m.values()) for m in ans_list)})
-            elif k == 'oneOf':
-                ans_list = v(node["value"])
-                t.append({k: reduce(xor, [all(m.values()) for m in ans_list])})
-            elif k == 'not':
-                ans_list = [fun(node["value"]) for fun in v.values()]
-                t.append({k: not_(all(ans_list))})
-            else:
-                ans_list = v(node["value"])
-                t.append({k: ans_list})
-    return t
-
-
-def functor_eval(functors: Callable, value):
-    return [{f: func[f](value) for f in func} for func in functors]
-
-
-def constraints(dataclass_instance):
-    fields_with_metadata = filter(lambda f: f.metadata != {}, fs(dataclass_instance))
-    final_form = list(map(lambda f: {'value': getattr(dataclass_instance,  f.name), 'name': f.name, 'metadata': f.metadata}, fields_with_metadata))
-
-    nodes = process_functors(final_form)
-
-    if len([n for n in nodes if not n.get('not', True)]) > 0:
-        raise e.SubSchemaFailureViolation("subschema failed")
-    if len([n for n in nodes if not n.get('oneOf', True)]) > 0:
-        raise e.SubSchemaFailureViolation("none or multiple of the subschemas failed")
-    if len([n for n in nodes if not n.get('anyOf', True)]) > 0:
-        raise e.SubSchemaFailureViolation("all of the subschemas failed")
-    if len([n for n in nodes if not n.get('allOf', True)]) > 0:
-        raise e.SubSchemaFailureViolation("at least one subschema failed")
-    if len([n for n in nodes if not n.get('type', True)]) > 0:
-        raise e.ValueTypeViolation("incorrect type assigned to JSON property")
-    if len([n for n in nodes if not n.get('enum', True)]) > 0:
-        raise e.ValueTypeViolation("string property much use declared enum values")
-    if len([n for n in nodes if not n.get('maximum', True)]) > 0:
-        raise e.RangeConstraintViolation("violates range contraint")
-    if len([n for n in nodes if not n.get('exclusiveMaximum', True)]) > 0:
-        raise e.RangeConstraintViolation("violates range contraint")
-    if len([n for n in nodes if not n.get('exclusiveMinimum', True)]) > 0:
-        raise e.RangeConstraintViolation("violates range contraint")
-    if len([n for n in nodes if not n.get('minimum', True)]) > 0:
-        raise e.RangeConstraintViolation("violates range contraint")
-    if len([n for n in nodes if not n.get('multipleOf', True)]) > 0:
-        raise e.RangeConstraintViolation("violates range contraint")
-    if len([n for n in nodes if not n.get('maxLength', True)]) > 0:
-        raise e.LengthConstraintViolation("violates length contraint")
-    if len([n for n in nodes if not n.get('minLength', True)]) > 0:
-        raise e.LengthConstraintViolation("violates length contraint")
-    return dataclass_instance
+CONSTRAINT_PRECEDENCE = (
+    ('not', e.SubSchemaFailureViolation, "subschema failed"),
+    ('oneOf', e.SubSchemaFailureViolation, "none or multiple of the subschemas failed"),
+    ('anyOf', e.SubSchemaFailureViolation, "all of the subschemas failed"),
+    ('allOf', e.SubSchemaFailureViolation, "at least one subschema failed"),
+    ('type', e.ValueTypeViolation, "incorrect type assigned to JSON property"),
+    ('enum', e.ValueTypeViolation, "string property much use declared enum values"),
+    ('maximum', e.RangeConstraintViolation, "violates range contraint"),
+    ('exclusiveMaximum', e.RangeConstraintViolation, "violates range contraint"),
+    ('exclusiveMinimum', e.RangeConstraintViolation, "violates range contraint"),
+    ('minimum', e.RangeConstraintViolation, "violates range contraint"),
+    ('interval', e.RangeConstraintViolation, "violates range contraint"),
+    ('multipleOf', e.RangeConstraintViolation, "violates range contraint"),
+    ('maxLength', e.LengthConstraintViolation, "violates length contraint"),
+    ('minLength', e.LengthConstraintViolation, "violates length contraint"),
+    ('format', e.FormatConstraintViolation, "violates format constraint"),
+    ('pattern', e.PatternConstraintViolation, "violates pattern constraint"),
+    ('maxItems', e.LengthConstraintViolation, "violates length contraint"),
+    ('minItems', e.LengthConstraintViolation, "violates length contraint"),
+    ('uniqueItems', e.ArrayConstraintViolation, "violates array constraint"),
+    ('prefixItems', e.ArrayConstraintViolation, "violates array constraint"),
+    ('items', e.ArrayConstraintViolation, "violates array constraint"),
+)
+
+EXCEPTION_RANK = {exc: rank for rank, exc in enumerate(dict.fromkeys(exc for _, exc, _ in CONSTRAINT_PRECEDENCE))}
+
+RANGE_KEYWORDS = {'minimum': False, 'exclusiveMinimum': True, 'maximum': False, 'exclusiveMaximum': True}
+
+ENUM_PRUNABLE = {'minimum', 'exclusiveMinimum', 'maximum', 'exclusiveMaximum', 'multipleOf', 'maxLength', 'minLength', 'format', 'pattern'}
+
+KEYWORD_COSTS = {'type': 1, 'interval': 1, 'maxLength': 1, 'minLength': 1, 'maxItems': 1, 'minItems': 1, 'enum': 2, 'multipleOf': 2, 'format': 3, 'pattern': 4, 'uniqueItems': 5, 'prefixItems': 6, 'items': 6}
+
+ARRAY_KEYWORDS = {'items', 'prefixItems', 'minItems', 'maxItems', 'uniqueItems'}
+
+TYPE_EXPRESSIONS = {
+    'string': 'isinstance({0}, str)',
+    'integer': 'isinstance({0}, int)',
+    'number': 'isinstance({0}, (float, int))',
+    'null': '{0} is None',
+    'boolean': 'isinstance({0}, bool)',
+    'array': 'isinstance({0}, (list, tuple))',
+    'object': 'isinstance({0}, dict)',
+}
+
+EXPRESSIONS = {
+    'type': lambda v, d, bind: TYPE_EXPRESSIONS[d].format(v),
+    'enum': lambda v, d, bind: f'type({v}).__hash__ is not None and {v} in {bind(d)}' if isinstance(d, frozenset) else f'{v} in {bind(d)}',  # a list or dict is never a member, not a TypeError
+    'minimum': lambda v, d, bind: f'{bind(d)} <= {v}',
+    'maximum': lambda v, d, bind: f'{v} <= {bind(d)}',
+    'exclusiveMinimum': lambda v, d, bind: f'{bind(d)} < {v}',
+    'exclusiveMaximum': lambda v, d, bind: f'{v} < {bind(d)}',
+    'multipleOf': lambda v, d, bind: f'{v} % {bind(d)} == 0',
+    'maxLength': lambda v, d, bind: f'len({v}) <= {bind(d)}',
+    'minLength': lambda v, d, bind: f'len({v}) >= {bind(d)}',
+    'interval': lambda v, d, bind: interval_expression(v, d, bind),
+    'format': lambda v, d, bind: f'not isinstance({v}, str) or {bind(FORMAT_CHECKERS[d])}({v})' if d in FORMAT_CHECKERS else 'True',
+    'pattern': lambda v, d, bind: f'not isinstance({v}, str) or {bind(pattern_matcher(d))}({v}) is not None',
+    'not': lambda v, d, bind: f'not ({subschema_expression(v, d, bind)})',
+    'anyOf': lambda v, d, bind: f'{bind(d)}({v})' if isinstance(d, combinators.AdaptiveBranches) else ' or '.join(f'({subschema_expression(v, s, bind)})' for s in d) or 'False',
+    'allOf': lambda v, d, bind: f'{bind(d)}({v})' if isinstance(d, combinators.AdaptiveBranches) else ' and '.join(f'({subschema_expression(v, s, bind)})' for s in d) or 'True',
+    'oneOf': lambda v, d, bind: f'{bind(d)}({v})' if isinstance(d, combinators.AdaptiveBranches) else one_of_expression(v, d, bind),
+    'maxItems': lambda v, d, bind: f'not isinstance({v}, (list, tuple)) or len({v}) <= {bind(d)}',
+    'minItems': lambda v, d, bind: f'not isinstance({v}, (list, tuple)) or len({v}) >= {bind(d)}',
+    'uniqueItems': lambda v, d, bind: f'not isinstance({v}, (list, tuple)) or {bind(arrays.unique_items)}({v})' if d else 'True',
+    'items': lambda v, d, bind: f'not isinstance({v}, (list, tuple)) or {bind(items_predicate(d))}({v})',
+    'prefixItems': lambda v, d, bind: f'not isinstance({v}, (list, tuple)) or {bind(prefix_predicate(d))}({v})',
+}
+
+SCHEMA_KEYWORDS = EXPRESSIONS.keys() - {'interval'}  # interval is ours, merged from the range keywords
+
+
+def constant_binder(constants: dict) -> Callable:
+    def bind(value):
+        if value is None or type(value) in (bool, int, str) or (type(value) is float and isfinite(value)):
+            return repr(value)
+        name = f'_c{len(constants)}'
+        constants[name] = value
+        return name
+    return bind
+
+
+def one_of_expression(var: str, branches: list, bind: Callable) -> str:
+    exprs = [subschema_expression(var, s, bind) for s in branches]
+    n = f'_n{sum(map(len, exprs))}'  # nested oneOf texts are shorter, so they never share a counter
+    passes = ' or '.join(f'(({expr}) and ({n} := {n} + 1) > 1)' for expr in exprs)  # true at the second passing branch
+    return f'({n} := 0) == 0 and not ({passes or "False"}) and {n} == 1'
+
+
+def interval_expression(var: str, interval: tuple, bind: Callable) -> str:
+    lo, lo_strict, hi, hi_strict = interval
+    lower = '' if lo is None else f'{bind(lo)} {"<" if lo_strict else "<="} '
+    upper = '' if hi is None else f' {"<" if hi_strict else "<="} {bind(hi)}'
+    return f'{lower}{var}{upper}'
+
+
+def subschema_expression(var: str, struct: dict, bind: Callable) -> str:
+    exprs = [f'({EXPRESSIONS[k](var, struct[k], bind)})' for k, _, _ in CONSTRAINT_PRECEDENCE if k in struct]
+    return ' and '.join(exprs) or 'True'
+
+
+def hashable_enum(values):
+    try:
+        return frozenset(values)
+    except TypeError:
+        return tuple(values)
+
+
+def implied_by_enum(kw: str, arg, values) -> bool:
+    try:
+        return all(COMPARISONS[kw](arg)(x) for x in values)
+    except TypeError:
+        return False
+
+
+def merge_interval(struct: dict) -> tuple:
+    lo, lo_strict, hi, hi_strict = None, False, None, False
+    for k in ('minimum', 'exclusiveMinimum'):
+        if k in struct and (lo is None or struct[k] > lo or (struct[k] == lo and RANGE_KEYWORDS[k])):
+            lo, lo_strict = struct[k], RANGE_KEYWORDS[k]
+    for k in ('maximum', 'exclusiveMaximum'):
+        if k in struct and (hi is None or struct[k] < hi or (struct[k] == hi and RANGE_KEYWORDS[k])):
+            hi, hi_strict = struct[k], RANGE_KEYWORDS[k]
+    return (lo, lo_strict, hi, hi_strict)
+
+
+def fold_combinators(struct: dict) -> dict:
+    if 'not' in struct:
+        struct['not'] = optimize_subschema(struct['not'])
+    for kw in ('anyOf', 'allOf', 'oneOf'):
+        if kw in struct:
+            struct[kw] = [optimize_subschema(s) for s in struct[kw]]
+    if {} in struct.get('anyOf', []):  # an empty branch always passes
+        del struct['anyOf']
+    if 'allOf' in struct:
+        struct['allOf'] = [s for s in struct['allOf'] if s != {}]
+        if not struct['allOf']:
+            del struct['allOf']
+    return struct
+
+
+def boolean_subschema(struct) -> dict:  # true accepts everything, false nothing
+    return {} if struct is True else {'not': {}} if struct is False else struct
+
+
+def fold_arrays(struct: dict) -> dict:
+    prefix = tuple(optimize_subschema(boolean_subschema(s)) for s in struct.pop('prefixItems', ()))
+    items = optimize_subschema(boolean_subschema(struct.pop('items', True)))
+    if items == {'not': {}}:  # nothing past the prefix
+        struct['maxItems'], items = min(struct.get('maxItems', len(prefix)), len(prefix)), {}
+    if prefix and (items or any(prefix)):
+        struct['prefixItems'] = (prefix, items or None)
+    elif items:
+        struct['items'] = items
+    if not struct.get('uniqueItems', True):
+        del struct['uniqueItems']
+    if struct.get('minItems') == 0:
+        del struct['minItems']
+    return struct
+
+
+def items_predicate(struct: dict) -> Callable:
+    return INTERN_TABLE.get('items', struct, lambda: arrays.items_checker(struct, predicate_function(struct)))
+
+
+def prefix_predicate(arg: tuple) -> Callable:
+    prefix, items = arg
+    return INTERN_TABLE.get('prefixItems', arg, lambda: arrays.prefix_checker(tuple(map(predicate_function, prefix)), items and items_predicate(items)))
+
+
+def optimize_subschema(struct: dict) -> dict:
+    struct = {k: v for k, v in struct.items() if k in SCHEMA_KEYWORDS}
+    if ARRAY_KEYWORDS & struct.keys():
+        struct = fold_arrays(struct)
+    if 'enum' in struct:  # type stays, so a list or dict still fails as a type and check() says so
+        struct = {k: v for k, v in struct.items() if k not in ENUM_PRUNABLE or not implied_by_enum(k, v, struct['enum'])}
+        struct['enum'] = hashable_enum(struct['enum'])
+    if RANGE_KEYWORDS.keys() & struct.keys():
+        struct['interval'] = merge_interval(struct)
+        struct = {k: v for k, v in struct.items() if k not in RANGE_KEYWORDS}
+    if struct.get('type') == 'integer' and struct.get('multipleOf') and 1 % struct['multipleOf'] == 0:
+        del struct['multipleOf']
+    if struct.get('minLength') == 0:
+        del struct['minLength']
+    if 'format' in struct and struct['format'] not in FORMAT_CHECKERS:  # unknown formats only annotate
+        del struct['format']
+    return fold_combinators(struct)
+
+
+def constraint_cost(kw: str, arg) -> int:
+    if kw in ('anyOf', 'allOf', 'oneOf'):
+        return 1 + sum(constraint_cost(k, v) for s in arg for k, v in s.items())
+    if kw == 'not':
+        return 1 + sum(constraint_cost(k, v) for k, v in arg.items())
+    if kw == 'enum' and isinstance(arg, (list, tuple)):
+        return len(arg)
+    return KEYWORD_COSTS.get(kw, 1)
+
+
+def constraint_plan(properties: dict) -> list:
+    return [(kw, k, v[kw], exc, msg) for kw, exc, msg in CONSTRAINT_PRECEDENCE for k, v in properties.items() if kw in v]
+
+
+def optimize_plan(properties: dict) -> list:
+    plan = constraint_plan({k: optimize_subschema(v) for k, v in properties.items()})
+    return sorted(plan, key=lambda c: (EXCEPTION_RANK[c[3]], constraint_cost(c[0], c[2])))
+
+
+def generate_validator_source(plan: list, bind: Callable, models: dict = {}, required: tuple = (), freezers: dict = {}) -> str:
+    local = {k: f'v{i}' for i, k in enumerate(dict.fromkeys([*models, *freezers, *(c[1] for c in plan)]))}
+    lines = ['def __post_init__(self):']
+    lines += [f'    {v} = self.{k}' for k, v in local.items()]
+    lines += generate_freeze_lines(freezers, bind, local)
+    lines += generate_model_lines(models, bind, local, required)
+    for kw, k, arg, exc, msg in plan:
+        lines.append(f'    if not ({EXPRESSIONS[kw](local[k], arg, bind)}):')
+        lines.append(f'        raise e.{exc.__name__}({msg!r})')
+    lines.append('    self._errorhandler(self)._renderer(self)')
+    return '\n'.join(lines) + '\n'
+
+
+def generate_freeze_lines(freezers: dict, bind: Callable, local: dict) -> list:
+    lines = list()
+    for k, freeze in freezers.items():  # arrays are stored as tuples, so instances stay hashable
+        lines.append(f'    if type({local[k]}) is list:')
+        lines.append(f'        {local[k]} = {bind(freeze)}({local[k]})')
+        lines.append(f'        object.__setattr__(self, {k!r}, {local[k]})')
+    return lines
+
+
+def array_freezer(struct: dict) -> Callable:
+    items = struct.get('items')
+    return tuple if 'prefixItems' not in struct and isinstance(items, dict) and items.get('type') in arrays.SCALAR_TYPES else arrays.freeze
+
+
+def generate_model_lines(models: dict, bind: Callable, local: dict, required: tuple) -> list:
+    lines = list()
+    for k, klass in models.items():  # nested objects are built once, from a dict; absent optional ones stay None
+        m = bind(klass)
+        lines.append(f'    if not isinstance({local[k]}, {m}){"" if k in required else f" and {local[k]} is not None"}:')
+        lines.append(f'        if not isinstance({local[k]}, dict):')
+        lines.append("            raise e.ValueTypeViolation('incorrect type assigned to JSON property')")
+        lines.append(f'        {local[k]} = {m}(**{local[k]})')
+        lines.append(f'        object.__setattr__(self, {k!r}, {local[k]})')
+    return lines
+
+
+def generate_metered_source(klassname: str, plan: list, bind: Callable, models: dict = {}, required: tuple = (), freezers: dict = {}) -> str:
+    local = {k: f'v{i}' for i, k in enumerate(dict.fromkeys([*models, *freezers, *(c[1] for c in plan)]))}
+    lines = ['def __post_init__(self):', '    _start = _last = _clock()', "    _kw = 'properties'", '    try:']
+    body = [f'    {v} = self.{k}' for k, v in local.items()]
+    body += generate_freeze_lines(freezers, bind, local)
+    body += generate_model_lines(models, bind, local, required)
+    if models:
+        body += ['    _now = _clock()', f"    _m.keyword({klassname!r}, 'properties', _now - _last)", '    _last = _now']
+    for kw, k, arg, exc, msg in plan:
+        body.append(f'    _kw = {plan_keyword(kw, arg)!r}')
+        body.append(f'    if not ({EXPRESSIONS[kw](local[k], arg, bind)}):')
+        body.append(f'        _kw = {violation_keyword(kw, arg, local[k], bind)}')
+        body.append(f'        raise e.{exc.__name__}({msg!r})')
+        body.append('    _now = _clock()')
+        body.append(f'    _m.keyword({klassname!r}, _kw, _now - _last)')
+        body.append('    _last = _now')
+    body += ['    _kw = None', '    self._errorhandler(self)._renderer(self)']
+    lines += ['    ' + line for line in body]
+    lines += ['    except BaseException as exc:', f'        _m.failed({klassname!r}, _kw, exc, _clock() - _start)', '        raise']
+    lines.append(f'    _m.built({klassname!r}, _clock() - _start)')
+    return '\n'.join(lines) + '\n'
+
+
+Violation = namedtuple('Violation', 'field keyword value')
+
+
+def plan_keyword(kw: str, arg) -> str:  # merged ranges are reported under the schema keywords they came from
+    if kw != 'interval':
+        return kw
+    lo, lo_strict, hi, hi_strict = arg
+    bounds = ('exclusiveMinimum' if lo_strict else 'minimum') if lo is not None else None, ('exclusiveMaximum' if hi_strict else 'maximum') if hi is not None else None
+    return '+'.join(filter(None, bounds))
+
+
+def violation_keyword(kw: str, arg, var: str, bind: Callable) -> str:
+    if kw != 'interval':
+        return repr(kw)
+    lo, lo_strict, hi, hi_strict = arg
+    lower, upper = 'exclusiveMinimum' if lo_strict else 'minimum', 'exclusiveMaximum' if hi_strict else 'maximum'
+    if lo is None or hi is None:
+        return repr(upper if lo is None else lower)
+    return f'({lower!r} if not ({interval_expression(var, (lo, lo_strict, None, False), bind)}) else {upper!r})'
+
+
+def field_default(f: Field, bind: Callable) -> str:
+    if f.default is not MISSING:
+        return bind(f.default)
+    if f.default_factory is not MISSING:
+        return f'{bind(f.default_factory)}()'
+    return None
+
+
+def generate_loads(entries: list, bind: Callable, local: dict, on_missing: str) -> list:
+    lines = list()
+    for name, _, f in entries:
+        lines.append(f'    {local[name]} = kw.pop({name!r}, _missing)')
+        lines.append(f'    if {local[name]} is _missing:')
+        default = field_default(f, bind)
+        lines.append(f'        {local[name]} = {default}' if default else on_missing.format(name=name, ok=f'ok_{local[name]}'))
+    return lines
+
+
+def generate_check_source(plan: list, bind: Callable, entries: list, models: dict, required: tuple = ()) -> str:
+    local = {name: f'v{i}' for i, (name, _, _) in enumerate(entries)}
+    lines = ['def check(klass, /, **kw):', '    out = []']
+    lines += [f'    ok_{v} = True' for v in local.values()]
+    lines += generate_loads(entries, bind, local, "        {ok} = False\n        out.append(_V({name!r}, 'required', None))")
+    lines += ['    if kw:', "        out.extend(_V(k, 'additionalProperties', v) for k, v in kw.items())"]
+    for k, klass in models.items():
+        v, m = local[k], bind(klass)
+        lines.append(f'    if ok_{v} and not isinstance({v}, {m}){"" if k in required else f" and {v} is not None"}:')
+        lines.append(f'        if isinstance({v}, dict) and all(isinstance(x, str) for x in {v}):')  # or ** raises
+        lines.append(f'            out.extend(_V({k + "."!r} + x.field, x.keyword, x.value) for x in {m}.check(**{v}))')
+        lines.append('        else:')
+        lines.append(f"            out.append(_V({k!r}, 'type', {v}))")
+    for kw, k, arg, _, _ in plan:
+        v = local[k]
+        append = f'            ok_{v} = False\n            out.append(_V({k!r}, {violation_keyword(kw, arg, v, bind)}, {v}))'
+        lines.append(f'    if ok_{v}:')
+        lines.append('        try:')
+        lines.append(f'            if not ({EXPRESSIONS[kw](v, arg, bind)}):')
+        lines.append('    ' + append.replace('\n', '\n    '))
+        lines.append('        except TypeError:')
+        lines.append(append)
+    lines.append('    return tuple(out)')
+    return '\n'.join(lines) + '\n'
+
+
+def generate_is_valid_source(plan: list, bind: Callable, entries: list, models: dict, required: tuple = ()) -> str:
+    local = {name: f'v{i}' for i, (name, _, _) in enumerate(entries)}
+    lines = ['def is_valid(klass, /, **kw):']
+    lines += generate_loads(entries, bind, local, '        return False')
+    lines += ['    if kw:', '        return False', '    try:']
+    for k, klass in models.items():
+        v, m = local[k], bind(klass)
+        lines.append(f'        if not isinstance({v}, {m}){"" if k in required else f" and {v} is not None"}:')
+        lines.append(f'            if not (isinstance({v}, dict) and {m}.is_valid(**{v})):')
+        lines.append('                return False')
+    for kw, k, arg, _, _ in plan:
+        lines.append(f'        if not ({EXPRESSIONS[kw](local[k], arg, bind)}):')
+        lines.append('            return False')
+    lines += ['    except TypeError:', '        return False', '    return True']
+    return '\n'.join(lines) + '\n'
+
+
+def generate_trusted_body(entries: list, bind: Callable, models: dict, freezers: dict) -> list:
+    lines = list()
+    for i, (name, _, _) in enumerate(entries):
+        if name in models:  # nested values may come as instances, dicts or totuple() output
+            m = bind(models[name])
+            lines.append(f'    if type(v{i}) is dict:')
+            lines.append(f'        v{i} = {m}.trusted(**v{i})')
+            lines.append(f'    elif type(v{i}) is tuple:')
+            lines.append(f'        v{i} = {m}.from_trusted_tuple(v{i})')
+        if name in freezers:
+            lines.append(f'    if type(v{i}) is list:')
+            lines.append(f'        v{i} = {bind(freezers[name])}(v{i})')
+    lines.append('    self = _new(klass)')
+    lines += [f'    _set(self, {name!r}, v{i})' for i, (name, _, _) in enumerate(entries)]
+    lines += ['    self._renderer(self)', '    return self']
+    return lines
+
+
+def generate_trusted_source(entries: list, bind: Callable, models: dict, freezers: dict) -> str:
+    local = {name: f'v{i}' for i, (name, _, _) in enumerate(entries)}
+    lines = ['def trusted(klass, /, **kw):']
+    lines += generate_loads(entries, bind, local, "        raise TypeError(\"trusted() missing required argument {name!r}\")")
+    lines += ['    if kw:', "        raise TypeError(f'trusted() got an unexpected keyword argument {next(iter(kw))!r}')"]
+    lines += generate_trusted_body(entries, bind, models, freezers)
+    lines += ['def from_trusted_tuple(klass, t, /):', f'    [{", ".join(local.values())}] = t']
+    lines += generate_trusted_body(entries, bind, models, freezers)
+    return '\n'.join(lines) + '\n'
+
+
+def generate_evolve_source(changed: frozenset, plan: list, bind: Callable, names: tuple, models: dict, freezers: dict, required: tuple = ()) -> str:
+    local = {k: f'v{i}' for i, k in enumerate(names)}
+    lines = ['def evolve(self, kw):']
+    lines += [f'    {local[k]} = kw[{k!r}]' for k in names if k in changed]
+    for k in (k for k in freezers if k in changed):
+        lines.append(f'    if type({local[k]}) is list:')
+        lines.append(f'        {local[k]} = {bind(freezers[k])}({local[k]})')
+    for k in (k for k in models if k in changed):  # same rules as the constructor for nested objects
+        v, m = local[k], bind(models[k])
+        lines.append(f'    if not isinstance({v}, {m}){"" if k in required else f" and {v} is not None"}:')
+        lines.append(f'        if not isinstance({v}, dict):')
+        lines.append("            raise e.ValueTypeViolation('incorrect type assigned to JSON property')")
+        lines.append(f'        {v} = {m}(**{v})')
+    for kw, k, arg, exc, msg in plan:  # untouched fields already passed, so plan order still decides which error wins
+        if k in changed:
+            lines.append(f'    if not ({EXPRESSIONS[kw](local[k], arg, bind)}):')
+            lines.append(f'        raise e.{exc.__name__}({msg!r})')
+    lines.append('    new = _new(type(self))')
+    lines += [f'    _set(new, {k!r}, {local[k] if k in changed else f"self.{k}"})' for k in names]
+    lines += ['    new._errorhandler(new)._renderer(new)', '    return new']
+    return '\n'.join(lines) + '\n'
+
+
+def compile_evolver(klassname: str, plan: list, names: tuple, models: dict, freezers: dict, required: tuple = ()) -> Callable:
+    evolvers = dict()  # one compiled function per set of changed fields
+
+    def evolve(self, /, **changes):
+        if not changes:
+            return self
+        changed = frozenset(changes)
+        fn = evolvers.get(changed)
+        if fn is None:
+            if not changed <= set(names):
+                raise TypeError(f'evolve() got an unexpected keyword argument {min(changed - set(names))!r}')
+            constants = {'_new': object.__new__, '_set': object.__setattr__}
+            source = generate_evolve_source(changed, plan, constant_binder(constants), names, models, freezers, required)
+            fn = evolvers[changed] = compile_function(source, {'e': e, **constants}, 'evolve', f'<schemamodels {klassname}.evolve {"/".join(sorted(changed))}>')
+        return fn(self, changes)
+    return evolve
+
+
+def compile_function(source: str, namespace: dict, name: str, filename: str) -> Callable:
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    exec(compile(source, filename, 'exec'), namespace)
+    return namespace[name]
+
+
+def adaptive_plan(plan: list) -> list:  # combinators become stateful objects that learn a branch order
+    return [(kw, k, combinators.AdaptiveBranches(kw, tuple(map(predicate_function, arg))) if kw in combinators.EVALUATORS else arg, exc, msg) for kw, k, arg, exc, msg in plan]
+
+
+def class_plan(properties: dict, entries: list, models: dict, adaptive: bool = False) -> tuple:  # models are checked by their own classes
+    plan = optimize_plan({k: v for k, v in properties.items() if k not in models})
+    if adaptive:
+        plan = adaptive_plan(plan)
+    required = tuple(name for name, _, f in entries if f.default is MISSING and f.default_factory is MISSING)
+    freezers = {k: array_freezer(v) for k, v in properties.items() if v.get('type') == 'array'}
+    return plan, required, freezers
+
+
+def generate_class_source(klassname: str, properties: dict, entries: list, models: dict, bind: Callable, metrics: Metrics = None, adaptive: bool = False) -> tuple:
+    plan, required, freezers = class_plan(properties, entries, models, adaptive)
+    source = ''.join([  # one namespace, so the constructor and check()/is_valid() share every compiled constant
+        generate_metered_source(klassname, plan, bind, models, required, freezers) if metrics else generate_validator_source(plan, bind, models, required, freezers),
+        generate_check_source(plan, bind, entries, models, required),
+        generate_is_valid_source(plan, bind, entries, models, required),
+        generate_trusted_source(entries, bind, models, freezers),
+    ])
+    return source, plan, models, freezers
+
+
+def compile_methods(klassname: str, name: str, generate: Callable) -> dict:
+    constants = {'_missing': MISSING, '_V': Violation, '_new': object.__new__, '_set': object.__setattr__}
+    namespace = {'e': e, **constants}
+    compile_function(generate(constant_binder(namespace)), namespace, name, f'<schemamodels {klassname} {name}>')
+    return namespace
+
+
+class LazyMethod:  # compiled on first use, most models never call check() and friends
+    def __init__(self, name: str, methods: Callable, wrap: Callable = classmethod):
+        self.name = name
+        self.methods = methods
+        self.wrap = wrap
+
+    def __get__(self, instance, owner):
+        method = self.wrap(self.methods()[self.name])
+        setattr(owner, self.name, method)  # later lookups find the plain method
+        return method.__get__(instance, owner)
+
+
+def compile_validator(klassname: str, properties: dict, entries: list, models: dict, metrics: Metrics = None, adaptive: bool = False) -> dict:
+    plan, required, freezers = class_plan(properties, entries, models, adaptive)
+    constants = {'_m': metrics, '_clock': metrics and metrics.clock}
+    bind = constant_binder(constants)
+    source = generate_metered_source(klassname, plan, bind, models, required, freezers) if metrics else generate_validator_source(plan, bind, models, required, freezers)
+    check = partial(compile_methods, klassname, 'check', lambda bind: generate_check_source(plan, bind, entries, models, required))
+    is_valid = partial(compile_methods, klassname, 'is_valid', lambda bind: generate_is_valid_source(plan, bind, entries, models, required))
+    trusted = lru_cache(maxsize=None)(partial(compile_methods, klassname, 'trusted', lambda bind: generate_trusted_source(entries, bind, models, freezers)))
+    return {
+        '__post_init__': compile_function(source, {'e': e, **constants}, '__post_init__', f'<schemamodels {klassname} validator>'),
+        'check': LazyMethod('check', check),
+        'is_valid': LazyMethod('is_valid', is_valid),
+        'trusted': LazyMethod('trusted', trusted),
+        'from_trusted_tuple': LazyMethod('from_trusted_tuple', trusted),
+        'evolve': compile_evolver(klassname, plan, tuple(name for name, _, _ in entries), models, freezers, required),
+    }
+
+
+PREDICATE_IDS = count()
+
+ON_ERROR_MODES = ('raise', 'skip', 'collect')
+
+
+def compile_predicate(struct: dict) -> Callable:
+    return predicate_function(optimize_subschema(struct))
+
+
+def predicate_function(struct: dict) -> Callable:  # struct is already optimized
+    return INTERN_TABLE.get('predicate', struct, partial(build_predicate, struct))
+
+
+def build_predicate(struct: dict) -> Callable:
+    constants = dict()
+    expr = subschema_expression('v', struct, constant_binder(constants))
+    return compile_function(f'def predicate(v):\n    return {expr}\n', constants, 'predicate', f'<schemamodels predicate {next(PREDICATE_IDS)}>')
+
+
+def validate_columns(klass, columns: dict, indices: bool = False) -> dict:
+    np = columnar.require_numpy('validate_columns')
+    properties = klass._schema['properties']
+    report = dict()
+    for name, column in columns.items():
+        if name not in properties:
+            raise TypeError(f"{klass.__name__} has no property {name!r}")
+        column = np.asarray(column)
+        struct = {k: v for k, v in properties[name].items() if k in SCHEMA_KEYWORDS}
+        masks = {k: columnar.failures(column, k, v, compile_predicate({k: v})) for k, v in struct.items()}
+        report[name] = {k: np.flatnonzero(m) for k, m in masks.items()} if indices else masks
+    return report
+
+
+def generate_records(klass, records, on_error: str, errors: list):
+    for i, record in enumerate(records):
+        try:
+            yield klass(**record)
+        except (e.SchemaViolation, TypeError) as err:  # TypeError: missing or unknown properties
+            if on_error == 'raise':
+                raise
+            if on_error == 'collect':
+                errors.append((i, err))
+
+
+def generate_stream(klass, items, decode: Callable, on_error: str, errors: list):
+    for i, (item, lineno, offset) in enumerate(items):
+        try:
+            yield klass(**decode(item))
+        except (e.SchemaViolation, TypeError, ValueError) as err:  # ValueError: malformed NDJSON line
+            err.lineno, err.offset = lineno, offset
+            if on_error == 'raise':
+                raise
+            if on_error == 'collect':
+                errors.append((i, err))
+
+
+def check_on_error(on_error: str, errors: list):
+    if on_error not in ON_ERROR_MODES:
+        raise ValueError(f"on_error must be one of {', '.join(ON_ERROR_MODES)}")
+    if on_error == 'collect' and errors is None:
+        raise ValueError("on_error='collect' needs an errors list to collect into")
+
+
+def from_records(klass, records, on_error: str = 'raise', errors: list = None):
+    check_on_error(on_error, errors)
+    return generate_records(klass, records, on_error, errors)
+
+
+def iter_ndjson(klass, fp, on_error: str = 'raise', errors: list = None, chunk_size: int = streaming.DEFAULT_CHUNK_SIZE, max_buffer: int = None):
+    check_on_error(on_error, errors)
+    return generate_stream(klass, streaming.ndjson_lines(fp, chunk_size, max_buffer), json.loads, on_error, errors)
+
+
+def iter_json_array(klass, fp, on_error: str = 'raise', errors: list = None, chunk_size: int = streaming.DEFAULT_CHUNK_SIZE, max_buffer: int = None):
+    check_on_error(on_error, errors)
+    return generate_stream(klass, streaming.JSONArrayReader(fp, chunk_size, max_buffer), lambda item: item, on_error, errors)
+
+
+def generate_export_source(names: tuple, models: dict = {}) -> str:
+    nested = {n: f'(None if self.{n} is None else self.{n}.' for n in models}
+    values = ''.join(f'{nested[n]}totuple()), ' if n in models else f'self.{n}, ' for n in names)
+    items = ''.join(f'{n!r}: {nested[n]}todict()), ' if n in models else f'{n!r}: self.{n}, ' for n in names)
+    return (
+        'def todict(self, deep=False):\n'
+        f'    return asdict(self) if deep else {{{items}}}\n'
+        'def tolist(self, deep=False):\n'
+        f'    return list(astuple(self)) if deep else [{values}]\n'
+        'def totuple(self, deep=False):\n'
+        f'    return astuple(self) if deep else ({values})\n'
+    )
+
+
+JSON_EXPRESSIONS = {  # the fast branch only when the value has the exact type, json.dumps for anything else
+    'integer': '(int.__repr__({0}) if type({0}) is int else _dumps({0}))',
+    'number': '(float.__repr__({0}) if type({0}) is float and -_inf < {0} < _inf else int.__repr__({0}) if type({0}) is int else _dumps({0}))',
+    'string': '(_str({0}) if type({0}) is str else _dumps({0}))',
+    'boolean': "('true' if {0} is True else 'false' if {0} is False else _dumps({0}))",
+}
+
+
+def generate_json_source(names: tuple, properties: dict, models: dict = {}) -> str:
+    lines = ['def tojson(self):']
+    lines += [f'    v{i} = self.{n}' for i, n in enumerate(names)]
+    parts = list()
+    for i, n in enumerate(names):
+        key = f'{"{" if i == 0 else ","}{json.dumps(n)}:'  # keys are escaped once, here
+        expr = f"('null' if v{i} is None else v{i}.tojson())" if n in models else JSON_EXPRESSIONS.get(properties[n].get('type'), '_dumps({0})').format(f'v{i}')
+        parts += [repr(key), expr]
+    lines.append(f"    return ''.join(({', '.join(parts)}, '}}'))" if names else "    return '{}'")
+    return '\n'.join(lines) + '\n'
+
+
+def export_methods(klassname: str, names: tuple, properties: dict, models: dict = {}) -> dict:
+    namespace = {'asdict': asdict, 'astuple': astuple, '_dumps': json.JSONEncoder(separators=(',', ':')).encode, '_str': json.encoder.encode_basestring_ascii, '_inf': float('inf')}
+    source = generate_export_source(names, models) + generate_json_source(names, properties, models)
+    compile_function(source, namespace, 'todict', f'<schemamodels {klassname} exports>')
+    return namespace
+
+
+def compile_exports(klassname: str, names: tuple, properties: dict, models: dict = {}) -> dict:
+    exports = lru_cache(maxsize=None)(partial(export_methods, klassname, names, properties, models))
+    return {k: LazyMethod(k, exports, lambda f: f) for k in ('todict', 'tolist', 'totuple', 'tojson')}
+
+
+def write_ndjson(klass, instances, fp, chunksize: int = 1024) -> int:
+    instances, n = iter(instances), 0
+    for chunk in iter(lambda: list(islice(instances, chunksize)), []):
+        fp.write('\n'.join(map(klass.tojson, chunk)) + '\n')  # one write per chunk
+        n += len(chunk)
+    return n
+
+
+def validate_list(klass, records: list, on_error: str) -> tuple:
+    errors = list()
+    return list(generate_records(klass, records, on_error, errors)), errors
+
+
+async def achunks(records, chunksize: int):
+    if not hasattr(records, '__aiter__'):
+        records = iter(records)
+        for chunk in iter(lambda: list(islice(records, chunksize)), []):
+            yield chunk
+        return
+    chunk = list()
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = list()
+    if chunk:
+        yield chunk
+
+
+async def avalidate_many(klass, records, on_error: str = 'raise', errors: list = None, chunksize: int = 256, offload: bool = False, executor=None) -> list:
+    import asyncio  # slow to import, and only this coroutine needs it
+    check_on_error(on_error, errors)
+    loop = asyncio.get_running_loop()
+    instances, start = list(), 0
+    async for chunk in achunks(records, chunksize):
+        if offload:
+            done, failures = await loop.run_in_executor(executor, validate_list, klass, chunk, on_error)
+        else:
+            done, failures = validate_list(klass, chunk, on_error)
+            await asyncio.sleep(0)  # let other tasks run between chunks
+        instances.extend(done)
+        if errors is not None:
+            errors.extend((start + i, err) for i, err in failures)
+        start += len(chunk)
+    return instances
+
+
+def row_getter(fields: tuple) -> Callable:
+    getter = attrgetter(*fields)
+    return getter if len(fields) > 1 else lambda instance: (getter(instance), )
+
+
+def write_csv(klass, instances, fp, header: bool = True, fields=None, **fmtparams):
+    getter = klass._csv_row if fields is None else row_getter(tuple(fields))
+    writer = csv.writer(fp, **{'lineterminator': '\n', **fmtparams})
+    if header:
+        writer.writerow(klass._csv_fields if fields is None else fields)
+    writer.writerows(map(getter, instances))
+
+
+def tocsv(self, header: bool = False, fields=None) -> str:
+    buf = io.StringIO()
+    write_csv(type(self), (self, ), buf, header, fields)
+    return buf.getvalue()[:-1]
+
+
+def schema_key(schema: dict, error_handler, renderer, base_uri: str = None, metrics: Metrics = None, adaptive: bool = False) -> tuple:
+    canonical = json.dumps(schema, sort_keys=True, separators=(',', ':'))
+    base_uri = base_uri if '"$ref"' in canonical else None  # relative $refs depend on where the schema lives
+    return (sha256(canonical.encode('utf-8')).hexdigest(), error_handler, renderer, base_uri, metrics, adaptive)
+
+
+def merge_pattern_properties(schema: dict) -> dict:
+    properties = dict(schema['properties'])
+    for regex, subschema in schema.get('patternProperties', {}).items():
+        for name in filter(compile_pattern(regex).search, schema['properties']):
+            properties[name] = merge_subschema(properties[name], subschema)
+    return {**schema, 'properties': properties}
+
+
+def nested_classname(klassname: str, name: str, struct: dict) -> str:  # qualified, so two schemas' $defs/money never replace each other
+    return klassname + generate_classname(struct.get('title', name))
+
+
+def model_field(name: str, klass, required: bool) -> tuple:
+    return (name, klass, field(default=MISSING if required else None))
+
+
+class ModelCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: tuple):
+        with self.lock:
+            klass = self.entries.get(key)
+            if klass is not None:
+                self.entries.move_to_end(key)
+            return klass
+
+    def put(self, key: tuple, klass):
+        with self.lock:
+            self.entries[key] = klass
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key: tuple) -> bool:
+        with self.lock:
+            return self.entries.pop(key, None) is not None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+MODEL_CACHE = ModelCache()
+
+
+def init_worker(error_handler, renderer, schemas: list, documents: dict):
+    factory = SchemaModelFactory(error_handler=error_handler, renderer=renderer, lazy=True)
+    for uri, document in documents.items():  # spawned workers can't see the parent's resolver
+        factory.resolver.add(document, uri)
+    for schema, base_uri in schemas:
+        factory.register(schema, base_uri=base_uri)
+
+
+def validate_chunk(klassname: str, records: list, on_error: str, compact: bool) -> tuple:
+    klass = getattr(importlib.import_module('schemamodels.dynamic'), klassname)
+    errors = list()
+    instances = from_records(klass, records, on_error, errors)
+    return ([i.totuple() for i in instances] if compact else list(instances)), errors
 
 
 class SchemaModelFactory:
-    def __init__(self, schemas=[], error_handler=DefaultErrorHandler, renderer=DefaultRenderer):
+    def __init__(self, schemas=[], error_handler=DefaultErrorHandler, renderer=DefaultRenderer, cache=MODEL_CACHE, lazy=False, metrics=None, adaptive=False):
         self.error_handler = error_handler
         self.renderer = renderer
+        self.cache = cache
+        self.lazy = lazy
+        self.metrics = Metrics() if metrics is True else metrics or None  # chosen once, at build time
+        self.adaptive = adaptive
+        self.resolver = Resolver()
+        self.schemas = dict()
         self.___check_custom_hooks()
         self.dmod = importlib.import_module('schemamodels.dynamic')
         list(map(lambda s: self.register(s), schemas))  # FIXME: find another way to 'process' the map
@@ -157,39 +877,92 @@ class SchemaModelFactory:
         self.error_handler()
         self.renderer()
 
-    def register(self, schema: dict) -> bool:
+    def cache_key(self, schema: dict, base_uri: str = None) -> tuple:
+        return schema_key(schema, self.error_handler, self.renderer, as_uri(base_uri) or schema.get('$id'), self.metrics, self.adaptive)
+
+    def invalidate(self, schema: dict, base_uri: str = None) -> bool:
+        return self.cache.invalidate(self.cache_key(schema, base_uri))
+
+    def get(self, name: str):
+        try:
+            return getattr(self.dmod, name)
+        except AttributeError:
+            return getattr(self.dmod, generate_classname(name))
+
+    def load_directory(self, path, pattern: str = '*.schema.json', lazy: bool = None) -> list:
+        documents = {p.resolve().as_uri(): json.loads(p.read_text(encoding='utf-8')) for p in sorted(Path(path).glob(pattern))}
+        for uri, schema in documents.items():  # so $refs between the files resolve by $id too
+            self.resolver.add(schema, uri, schema.get('$id'))
+        return [generate_classname(schema['title']) for uri, schema in documents.items() if self.register(schema, lazy=lazy, base_uri=uri)]
+
+    def validate_many(self, records, model: str, workers: int = None, chunksize: int = 1000, on_error: str = 'raise', errors: list = None, compact: bool = False):
+        check_on_error(on_error, errors)
+        return self.generate_many(iter(records), self.get(model).__name__, workers or os.cpu_count() or 1, chunksize, on_error, errors, compact)
+
+    def generate_many(self, records, klassname: str, workers: int, chunksize: int, on_error: str, errors: list, compact: bool):
+        initargs = (self.error_handler, self.renderer, list(self.schemas.values()), self.resolver.documents)
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=initargs) as pool:
+            pending, start = deque(), 0
+            for chunk in iter(lambda: list(islice(records, chunksize)), []):
+                pending.append((start, pool.submit(validate_chunk, klassname, chunk, on_error, compact)))
+                start += len(chunk)
+                while len(pending) > 2 * workers or (pending and pending[0][1].done()):
+                    yield from self.collect_chunk(*pending.popleft(), errors)
+            while pending:
+                yield from self.collect_chunk(*pending.popleft(), errors)
+
+    def collect_chunk(self, start: int, future, errors: list) -> list:
+        instances, failures = future.result()
+        if errors is not None:
+            errors.extend((start + i, err) for i, err in failures)
+        return instances
+
+    def register(self, schema: dict, lazy: bool = None, base_uri: str = None) -> bool:
         reqkws = {'title', 'type', 'properties'}
         if not reqkws <= schema.keys() or schema.get('type', None) != 'object':
             return False
         else:
             klassname = generate_classname(schema.get('title'))
+        self.schemas[klassname] = (schema, base_uri)
+        if self.lazy if lazy is None else lazy:
+            vars(self.dmod).pop(klassname, None)
+            self.dmod._pending[klassname] = partial(self.build, klassname, schema, base_uri)
+        else:
+            self.build(klassname, schema, base_uri)
+        return True
+
+    def build(self, klassname: str, schema: dict, base_uri: str = None):
+        base_uri = as_uri(base_uri) or schema.get('$id')
+        key = self.cache_key(schema, base_uri)
+        dataklass = self.cache.get(key)
+        if dataklass is None:
+            schema = merge_pattern_properties(self.resolver.inline_root(schema, base_uri or f'urn:schemamodels:{key[0]}'))
+            dataklass = self.generate_model(klassname, schema)
+            self.cache.put(key, dataklass)
+        setattr(self.dmod,
+                klassname,
+                dataklass)
+        self.dmod._pending.pop(klassname, None)
+        return dataklass
+
+    def generate_model(self, klassname: str, schema: dict):
         fields = deque()
         fields_with_defaults = deque()
         required_fields = schema.get('required', [])
-        if schema.get('anyOf', None):  # Top-level anyOf
-            funcs = [generate_functors(s) for s in schema['anyOf']]
-            # Do something with this
+        models = dict()
         for k, v in schema['properties'].items():
+            if v.get('type') == 'object' and 'properties' in v:  # nested object, its own dataclass
+                childname = nested_classname(klassname, k, v)
+                models[k] = self.build(childname, {**v, 'title': v.get('title', childname)})
+                (fields if k in required_fields else fields_with_defaults).appendleft(model_field(k, models[k], k in required_fields))
+                continue
             field_spec = dict()
-            field_meta = dict()
             entry = (k, )
-            if 'anyOf' in v:
-                funcs = [generate_functors(s) for s in v['anyOf']]
-                field_meta.update({'anyOf': partial(functor_eval, funcs)})
-            if 'oneOf' in v:
-                funcs = [generate_functors(s) for s in v['oneOf']]
-                field_meta.update({'oneOf': partial(functor_eval, funcs)})
-            if 'allOf' in v:
-                funcs = [generate_functors(s) for s in v['allOf']]
-                field_meta.update({'allOf': partial(functor_eval, funcs)})
-            if 'not' in v:
-                field_meta.update({'not': generate_functors(v.get('not'))})
 
             if v.get('type', None):
                 entry += (JSON_TYPE_MAP.get(v.get('type')), )
                 field_spec.update(default_factory=DEFAULT_FACTORIES[v.get('type')])
-            else:
-                print('not a built-in')
+            else:  # no type keyword to map
                 entry += (1, )
 
             if 'default' in v.keys():
@@ -198,9 +971,6 @@ class SchemaModelFactory:
             else:
                 field_spec.update(default_factory=DEFAULT_FACTORIES.get(v.get('type'), str))
 
-            field_meta.update(generate_functors(v))
-            field_spec.update(metadata=field_meta)
-
             if k in required_fields:
                 field_spec.update(default_factory=MISSING)
                 field_spec.update(default=MISSING)
@@ -208,10 +978,10 @@ class SchemaModelFactory:
             entry += (field(**field_spec), )
 
             # print(entry)
-            if not hasattr(entry, 'default'):
+            if k in required_fields:
                 fields.appendleft(entry)
             else:
-                fields.append(entry)
+                fields_with_defaults.appendleft(entry)
 
         dklass = partial(
             make_dataclass,
@@ -219,18 +989,31 @@ class SchemaModelFactory:
             fields + fields_with_defaults,
             frozen=True,
             namespace={
+                '__module__': self.dmod.__name__,
                 '_errorhandler': self.error_handler.apply,
                 '_renderer': self.renderer.apply,
-                'tocsv': lambda self, header=False, fields=schema['properties'].keys(): f'{",".join(fields)}\n{",".join(map(lambda i: asdict(self)[i], fields))}' if header else ",".join(map(lambda i: asdict(self)[i], fields)),
-                'tolist': lambda self: list(asdict(self).values()),
-                'todict': lambda self: asdict(self),
-                '__post_init__': lambda self: constraints(self)._errorhandler(self)._renderer(self)
+                '_schema': schema,
+                '_csv_fields': tuple(schema['properties']),
+                '_csv_row': row_getter(tuple(schema['properties'])),
+                'tocsv': tocsv,
+                'write_csv': classmethod(write_csv),
+                **compile_exports(klassname, tuple(f[0] for f in fields + fields_with_defaults), schema['properties'], models),
+                'write_ndjson': classmethod(write_ndjson),
+                'from_records': classmethod(from_records),
+                'validate_columns': classmethod(validate_columns),
+                'iter_ndjson': classmethod(iter_ndjson),
+                'iter_json_array': classmethod(iter_json_array),
+                'avalidate_many': classmethod(avalidate_many),
+                '_layout': packed.layout(tuple(f[0] for f in fields + fields_with_defaults), schema),
+                'tobytes': packed.tobytes,
+                'frombytes': classmethod(packed.frombytes),
+                'write_records': classmethod(packed.write_records),
+                'read_records': classmethod(packed.read_records),
+                **compile_validator(klassname, schema['properties'], list(fields + fields_with_defaults), models, self.metrics, self.adaptive)
             })
         if sys.version_info.major == 3 and sys.version_info.minor >= 10:
             dataklass = dklass(slots=True)
         else:
             dataklass = dklass()
-        setattr(self.dmod,
-                klassname,
-                dataklass)
-        return True
+        dataklass.Batch = batch_class(dataklass)
+        return dataklass
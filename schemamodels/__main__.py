@@ -0,0 +1,31 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from argparse import ArgumentParser
+import sys
+
+from schemamodels.static import compile_schemas
+
+
+def main(argv=None) -> int:
+    parser = ArgumentParser(prog='python -m schemamodels')
+    commands = parser.add_subparsers(dest='command', required=True)
+    compiler = commands.add_parser(
+        'compile', help='write the models for some schemas as a module')
+    compiler.add_argument('paths', nargs='+', help='schema files or folders')
+    compiler.add_argument('-o', '--output', help='defaults to stdout')
+    compiler.add_argument('--pattern', default='*.schema.json',
+                          help='schema files to pick up from folders')
+    args = parser.parse_args(argv)
+
+    source = compile_schemas(args.paths, args.pattern)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            fp.write(source)
+    else:
+        sys.stdout.write(source)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
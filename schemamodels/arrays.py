@@ -0,0 +1,137 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from typing import Callable
+
+from schemamodels.columnar import numpy
+
+
+VECTOR_THRESHOLD = 1024
+
+ARRAY_TYPES = (list, tuple)
+
+SCALAR_TYPES = {
+    'string': (str, ),
+    'integer': (int, ),
+    'number': (float, int),
+    'boolean': (bool, ),
+    'null': (type(None), ),
+}
+
+EXACT_TYPES = {  # what a type(x) sweep may see; isinstance is the fallback
+    'string': frozenset({str}),
+    'integer': frozenset({int, bool}),
+    'number': frozenset({float, int, bool}),
+    'boolean': frozenset({bool}),
+    'null': frozenset({type(None)}),
+}
+
+VECTOR_DTYPES = {
+    frozenset({float}): 'float64',
+    frozenset({int}): 'int64',
+}
+
+HOMOGENEOUS_KEYWORDS = {'type', 'interval', 'enum', 'multipleOf'}
+
+
+def json_key(v):  # equality as JSON sees it: 1 == 1.0, but True != 1
+    if isinstance(v, bool) or v is None:
+        return (type(v), v)
+    if isinstance(v, ARRAY_TYPES):
+        return (list, tuple(map(json_key, v)))
+    if isinstance(v, dict):
+        return (dict, frozenset((k, json_key(x)) for k, x in v.items()))
+    return (object, v)
+
+
+def unique_items(v) -> bool:
+    try:
+        if len(set(v)) == len(v):  # python equality only merges more values
+            return True
+    except TypeError:
+        pass
+    return len(set(map(json_key, v))) == len(v)
+
+
+def freeze(v):
+    if type(v) is list or type(v) is tuple:
+        return tuple(map(freeze, v))
+    return v
+
+
+def homogeneous(struct: dict) -> bool:
+    return struct.get('type') in SCALAR_TYPES and (
+        struct.keys() <= HOMOGENEOUS_KEYWORDS)
+
+
+def vector(v, kinds: frozenset):
+    if len(v) < VECTOR_THRESHOLD or kinds not in VECTOR_DTYPES:
+        return None
+    np = numpy()
+    if np is None:
+        return None
+    try:
+        return np.fromiter(v, VECTOR_DTYPES[kinds], len(v))
+    except OverflowError:  # ints beyond int64 stay in python
+        return None
+
+
+def within(v, a, interval: tuple, floats: bool) -> bool:
+    lo, lo_strict, hi, hi_strict = interval
+    if floats and (numpy().isnan(a).any() if a is not None else any(
+            x != x for x in v)):  # nan fails every bound, min/max hide it
+        return False
+    least, most = (a.min(), a.max()) if a is not None else (min(v), max(v))
+    if lo is not None and (least <= lo if lo_strict else least < lo):
+        return False
+    return hi is None or (most < hi if hi_strict else most <= hi)
+
+
+def multiples(v, a, d) -> bool:
+    if a is not None and a.dtype.kind == 'i' and isinstance(d, int):
+        return bool((numpy().mod(a, d) == 0).all())
+    return all(x % d == 0 for x in v)
+
+
+def homogeneous_checker(struct: dict) -> Callable:
+    exact, kind = EXACT_TYPES[struct['type']], SCALAR_TYPES[struct['type']]
+    interval, enum = struct.get('interval'), struct.get('enum')
+    multiple = struct.get('multipleOf')
+
+    def check(v) -> bool:
+        kinds = frozenset(map(type, v))  # the single type sweep
+        if not kinds <= exact and not all(isinstance(x, kind) for x in v):
+            return False
+        if enum is not None and not (
+                enum.issuperset(v) if isinstance(enum, frozenset)
+                else all(x in enum for x in v)):
+            return False
+        if not v or (interval is None and multiple is None):
+            return True
+        a = vector(v, kinds)
+        floats = not all(issubclass(k, int) for k in kinds)
+        if interval is not None and not within(v, a, interval, floats):
+            return False
+        return multiple is None or multiples(v, a, multiple)
+    return check
+
+
+def items_checker(struct: dict, predicate: Callable) -> Callable:
+    if homogeneous(struct):
+        check = homogeneous_checker(struct)
+    else:
+        def check(v) -> bool:
+            return all(map(predicate, v))
+    check.__recipe__ = (items_checker, (struct, predicate))  # for compile
+    return check
+
+
+def prefix_checker(predicates: tuple, rest: Callable = None) -> Callable:
+    n = len(predicates)
+
+    def check(v) -> bool:
+        if not all(p(x) for p, x in zip(predicates, v)):
+            return False
+        return rest is None or len(v) <= n or rest(v[n:])
+    check.__recipe__ = (prefix_checker, (predicates, rest))
+    return check
@@ -0,0 +1,168 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from array import array
+from dataclasses import fields
+
+from schemamodels.columnar import numpy, require_numpy
+
+
+TYPECODES = {'integer': 'q', 'number': 'd'}
+
+EXACT_TYPES = {'q': int, 'd': float}
+
+DTYPES = {'integer': 'i8', 'number': 'f8', 'boolean': '?'}
+
+
+class Bitmap:
+    __slots__ = ('bits', 'length')
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.length = 0
+
+    def append(self, value):
+        if type(value) is not bool:
+            raise TypeError('bitmaps only hold booleans')
+        if not self.length & 7:
+            self.bits.append(0)
+        if value:
+            self.bits[self.length >> 3] |= 1 << (self.length & 7)
+        self.length += 1
+
+    def pop(self) -> bool:
+        value = self[self.length - 1]
+        self.length -= 1
+        self.bits[self.length >> 3] &= ~(1 << (self.length & 7))
+        if not self.length & 7:
+            del self.bits[-1]
+        return value
+
+    def __getitem__(self, i: int) -> bool:
+        return bool(self.bits[i >> 3] >> (i & 7) & 1)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        return map(self.__getitem__, range(self.length))
+
+    def tonumpy(self):
+        np = numpy()
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        return np.unpackbits(
+            bits, count=self.length, bitorder='little').view(bool)
+
+
+def new_column(kind: str):
+    if kind in TYPECODES:
+        return array(TYPECODES[kind])
+    return Bitmap() if kind == 'boolean' else list()
+
+
+def fits(column, value) -> bool:
+    if isinstance(column, array):  # exact types, array('q') would take True
+        return type(value) is EXACT_TYPES[column.typecode] and (
+            column.typecode == 'd' or -1 << 63 <= value < 1 << 63)
+    return not isinstance(column, Bitmap) or type(value) is bool
+
+
+def field_kinds(klass) -> dict:
+    properties = klass._schema['properties']
+    return {
+        f.name: properties.get(f.name, {}).get('type')
+        for f in fields(klass)}
+
+
+def field_dtype(kind: str, struct: dict):
+    if kind == 'string' and 'maxLength' in struct:
+        return f'U{struct["maxLength"]}'
+    return DTYPES.get(kind, 'O')
+
+
+class Batch:
+    model = None
+    kinds = dict()
+
+    def __init__(self, records=()):
+        self.length = 0
+        self.columns = {k: new_column(v) for k, v in self.kinds.items()}
+        self.extend(records)
+
+    def append(self, record):
+        model = self.model
+        instance = record if isinstance(record, model) else model(**record)
+        values = {name: getattr(instance, name) for name in self.columns}
+        for name, value in values.items():  # null, a bool, a huge int
+            if not fits(self.columns[name], value):
+                self.columns[name] = list(self.columns[name])
+        done = list()
+        try:
+            for name, value in values.items():
+                self.columns[name].append(value)
+                done.append(self.columns[name])
+        except Exception:  # e.g. BufferError, someone holds a view
+            for column in done:  # rows are all or nothing
+                column.pop()
+            raise
+        self.length += 1
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.row(j) for j in range(*i.indices(self.length))]
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError('batch index out of range')
+        return self.row(i)
+
+    def __iter__(self):
+        return map(self.row, range(self.length))
+
+    def row(self, i: int):  # values were validated on the way in
+        return self.model.from_trusted_tuple(
+            tuple(column[i] for column in self.columns.values()))
+
+    def column(self, name: str):
+        np = require_numpy('Batch.column')
+        column = self.columns[name]
+        if isinstance(column, array):
+            view = np.frombuffer(column, dtype=column.typecode)
+            return view.copy()  # a held view would block appends
+        if isinstance(column, Bitmap):
+            return column.tonumpy()
+        out = np.empty(len(column), dtype=object)
+        for i, value in enumerate(column):  # keeps tuples as single values
+            out[i] = value
+        return out
+
+    def dtype(self):
+        np = require_numpy('Batch.dtype')
+        properties = self.model._schema['properties']
+        return np.dtype([  # demoted columns (a null, a huge int) are objects
+            (k, 'O' if isinstance(self.columns[k], list) and v != 'string'
+             else field_dtype(v, properties.get(k, {})))
+            for k, v in self.kinds.items()])
+
+    def tonumpy(self):
+        np = require_numpy('Batch.tonumpy')
+        out = np.empty(self.length, dtype=self.dtype())
+        for name in self.columns:
+            out[name] = self.column(name)
+        return out
+
+
+def batch_class(klass) -> type:
+    return type(f'{klass.__name__}Batch', (Batch, ), {
+        '__module__': klass.__module__,
+        '__qualname__': f'{klass.__qualname__}.Batch',
+        'model': klass,
+        'kinds': field_kinds(klass),
+    })
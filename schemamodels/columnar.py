@@ -0,0 +1,70 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from functools import lru_cache
+from typing import Callable
+
+
+NUMERIC_KINDS = 'biuf'
+
+DTYPE_KINDS = {
+    'string': 'U',
+    'integer': 'biu',
+    'number': 'biuf',
+    'boolean': 'b',
+    'null': '',
+    'array': '',
+    'object': '',
+}
+
+VECTOR_COMPARISONS = {
+    'type': lambda c, d: numpy().full(c.shape, c.dtype.kind in DTYPE_KINDS[d]),
+    'enum': lambda c, d: numpy().isin(c, d),
+    'minimum': lambda c, d: c >= d,
+    'maximum': lambda c, d: c <= d,
+    'exclusiveMinimum': lambda c, d: c > d,
+    'exclusiveMaximum': lambda c, d: c < d,
+    'multipleOf': lambda c, d: numpy().mod(c, d) == 0,
+}
+
+NUMERIC_COMPARISONS = {
+    'minimum', 'maximum', 'exclusiveMinimum', 'exclusiveMaximum', 'multipleOf'
+}
+
+
+@lru_cache(maxsize=None)
+def numpy():  # imported on first use, it costs more than the rest of us
+    try:
+        import numpy
+    except ImportError:  # numpy is an optional dependency
+        return None
+    return numpy
+
+
+def require_numpy(feature: str):
+    np = numpy()
+    if np is None:
+        raise ImportError(f"{feature} requires numpy to be installed")
+    return np
+
+
+def elementwise(predicate: Callable, column):
+    def safe(v):
+        try:
+            return predicate(v)
+        except TypeError:
+            return False
+    ufunc = numpy().frompyfunc(safe, 1, 1)
+    return ufunc(column.astype(object)).astype(bool)
+
+
+def vectorizable(column, kw: str) -> bool:
+    if kw not in VECTOR_COMPARISONS or column.dtype.kind == 'O':
+        return False
+    return kw not in NUMERIC_COMPARISONS or column.dtype.kind in NUMERIC_KINDS
+
+
+def failures(column, kw: str, arg, predicate: Callable):
+    if vectorizable(column, kw):
+        return ~VECTOR_COMPARISONS[kw](column, arg)
+    return ~elementwise(predicate, column)
@@ -0,0 +1,77 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+REORDER_EVERY = 1024
+
+
+def first_pass(predicates: tuple, v) -> tuple:
+    for i, predicate in enumerate(predicates):
+        if predicate(v):
+            return True, i
+    return False, None
+
+
+def first_failure(predicates: tuple, v) -> tuple:
+    for i, predicate in enumerate(predicates):
+        if not predicate(v):
+            return False, i
+    return True, None
+
+
+def single_pass(predicates: tuple, v) -> tuple:
+    found = None
+    for i, predicate in enumerate(predicates):
+        if predicate(v):
+            if found is not None:
+                return False, found
+            found = i
+    return found is not None, found
+
+
+EVALUATORS = {  # each returns the outcome and the branch that settled it
+    'anyOf': first_pass,
+    'allOf': first_failure,
+    'oneOf': single_pass,
+}
+
+
+class AdaptiveBranches:
+    """Tries the branches that settle the outcome most often first."""
+
+    def __init__(self, kind: str, predicates: tuple,
+                 every: int = REORDER_EVERY):
+        self.kind = kind
+        self.evaluate = EVALUATORS[kind]
+        self.predicates = tuple(predicates)  # schema order
+        self.state = (tuple(range(len(self.predicates))), self.predicates)
+        self.hits = [0] * len(self.predicates)
+        self.every = every
+        self.calls = 0
+
+    def __call__(self, v) -> bool:
+        order, current = self.state  # swapped as one, so threads agree
+        try:
+            outcome, i = self.evaluate(current, v)
+        except TypeError:  # unguarded branches may rely on schema order
+            if current is self.predicates:
+                raise
+            return self.evaluate(self.predicates, v)[0]
+        if i is not None:  # counts may drop an update under threads
+            self.hits[order[i]] += 1
+        self.calls += 1
+        if self.calls >= self.every:
+            self.reorder()
+        return outcome
+
+    @property
+    def order(self) -> tuple:
+        return self.state[0]
+
+    def reorder(self):
+        order = tuple(sorted(self.order, key=lambda i: -self.hits[i]))
+        self.state = (order, tuple(self.predicates[i] for i in order))
+        self.hits = [n >> 1 for n in self.hits]  # older traffic fades
+        self.calls = 0
+
+    def __repr__(self):
+        return f'AdaptiveBranches({self.kind!r}, order={list(self.order)})'
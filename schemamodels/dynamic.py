@@ -1,2 +1,10 @@
 # SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
 # SPDX-License-Identifier: GPL-3.0-or-later
+
+_pending = dict()
+
+
+def __getattr__(name):
+    if name in _pending:  # registered lazily, build the class on first access
+        return _pending[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
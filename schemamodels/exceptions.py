@@ -17,3 +17,15 @@ class ValueTypeViolation(SchemaViolation): pass
 
 
 class SubSchemaFailureViolation(SchemaViolation): pass
+
+
+class PatternConstraintViolation(SchemaViolation): pass
+
+
+class FormatConstraintViolation(SchemaViolation): pass
+
+
+class ArrayConstraintViolation(SchemaViolation): pass
+
+
+class UnresolvableReferenceError(LookupError): pass
@@ -0,0 +1,114 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from datetime import date
+from functools import lru_cache
+from ipaddress import IPv6Address
+from re import compile as re_compile
+from typing import Callable
+
+
+PATTERN_CACHE_SIZE = 1024
+
+HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern: str):
+    return re_compile(pattern)
+
+
+def pattern_matcher(pattern: str) -> Callable:
+    compiled = compile_pattern(pattern)
+    if pattern.startswith('^') and '|' not in pattern:
+        return compiled.match  # already anchored, no need to scan
+    return compiled.search
+
+
+def digits(v: str) -> bool:
+    return v.isascii() and v.isdigit()
+
+
+def is_date(v: str) -> bool:  # fromisoformat's grammar varies by version
+    if len(v) != 10 or v[4] != '-' or v[7] != '-' or not digits(
+            v[:4] + v[5:7] + v[8:]):
+        return False
+    try:
+        date(int(v[:4]), int(v[5:7]), int(v[8:]))
+    except ValueError:
+        return False
+    return True
+
+
+def is_time(v: str) -> bool:  # HH:MM:SS, then an optional .fraction
+    return (
+        len(v) >= 8 and v[2] == v[5] == ':'
+        and digits(v[:2] + v[3:5] + v[6:8])
+        and int(v[:2]) <= 23 and int(v[3:5]) <= 59
+        and int(v[6:8]) <= 60  # a leap second
+        and (len(v) == 8 or (v[8] == '.' and digits(v[9:])))
+    )
+
+
+def is_offset(v: str) -> bool:
+    return v in ('Z', 'z') or (
+        len(v) == 6 and v[0] in '+-' and v[3] == ':'
+        and digits(v[1:3] + v[4:]) and int(v[1:3]) <= 23 and int(v[4:]) <= 59)
+
+
+def is_datetime(v: str) -> bool:
+    if len(v) < 20 or v[10] not in 'Tt' or not is_date(v[:10]):
+        return False
+    rest = v[11:]
+    split = len(rest) - (1 if rest[-1] in 'Zz' else 6)
+    return is_time(rest[:split]) and is_offset(rest[split:])
+
+
+def is_uuid(v: str) -> bool:
+    return (
+        len(v) == 36
+        and v[8] == v[13] == v[18] == v[23] == '-'
+        and HEX_DIGITS.issuperset(v[:8] + v[9:13] + v[14:18] + v[19:23])
+        and HEX_DIGITS.issuperset(v[24:])
+    )
+
+
+def is_email(v: str) -> bool:
+    local, _, domain = v.rpartition('@')
+    quoted = len(local) > 1 and local[0] == local[-1] == '"'
+    return (
+        bool(local) and bool(domain) and len(local) <= 64
+        and ('@' not in local or quoted)
+        and not domain.startswith('.') and not domain.endswith('.')
+        and len(v.split()) == 1 and v == v.strip()
+    )
+
+
+def is_octet(part: str) -> bool:
+    return (
+        part.isdigit() and part.isascii() and len(part) <= 3
+        and (part == '0' or part[0] != '0') and int(part) <= 255
+    )
+
+
+def is_ipv4(v: str) -> bool:
+    parts = v.split('.')
+    return len(parts) == 4 and all(map(is_octet, parts))
+
+
+def is_ipv6(v: str) -> bool:
+    try:
+        IPv6Address(v)
+    except ValueError:
+        return False
+    return True
+
+
+FORMAT_CHECKERS = {
+    'date': is_date,
+    'date-time': is_datetime,
+    'uuid': is_uuid,
+    'email': is_email,
+    'ipv4': is_ipv4,
+    'ipv6': is_ipv6,
+}
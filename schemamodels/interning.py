@@ -0,0 +1,126 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from collections import namedtuple, OrderedDict
+from functools import partial
+from operator import itemgetter
+from threading import Lock
+from types import BuiltinFunctionType, FunctionType, ModuleType
+from typing import Callable
+import linecache
+import sys
+
+
+InternStats = namedtuple(
+    'InternStats', 'entries hits misses hit_rate bytes_saved')
+
+SCALARS = (type(None), bool, int, float, str)
+
+
+def canonical(value):  # equal JSON content, equal key; 1, 1.0, True differ
+    if type(value) in SCALARS:
+        return (type(value), value)
+    if isinstance(value, dict):
+        items = sorted(value.items(), key=itemgetter(0))
+        return (dict, tuple((k, canonical(v)) for k, v in items))
+    if isinstance(value, (list, tuple)):
+        return (list, tuple(map(canonical, value)))
+    if isinstance(value, (set, frozenset)):
+        return (frozenset, frozenset(map(canonical, value)))
+    raise TypeError(f'cannot intern {type(value).__name__} values')
+
+
+def is_generated(fn: FunctionType) -> bool:
+    return fn.__code__.co_filename.startswith('<schemamodels')
+
+
+def cell_contents(cells) -> list:
+    contents = list()
+    for cell in cells or ():
+        try:
+            contents.append(cell.cell_contents)
+        except ValueError:  # not assigned yet
+            pass
+    return contents
+
+
+def children(value) -> list:
+    if isinstance(value, dict):
+        return [*value.keys(), *value.values()]
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return list(value)
+    if isinstance(value, partial):
+        return [value.func, value.args, value.keywords]
+    if not isinstance(value, FunctionType):
+        return []
+    cells = cell_contents(value.__closure__)
+    if is_generated(value):  # its code, namespace and source are its own too
+        code = value.__code__
+        namespace = {
+            k: v for k, v in value.__globals__.items() if k != '__builtins__'}
+        return [*cells, code, namespace, linecache.cache.get(code.co_filename)]
+    return [*cells, value.__defaults__]
+
+
+def footprint(value, seen: dict = None) -> int:  # an estimate, in bytes
+    seen = dict() if seen is None else seen  # holds on to what it counted
+    if id(value) in seen or value is None or isinstance(
+            value, (type, ModuleType, BuiltinFunctionType)):
+        return 0
+    seen[id(value)] = value
+    return sys.getsizeof(value) + sum(
+        footprint(child, seen) for child in children(value))
+
+
+class InternTable:
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.sizes = dict()
+        self.lock = Lock()
+        self.hits = self.misses = self.saved = 0
+
+    def get(self, kind, struct, build: Callable):
+        try:
+            key = (kind, canonical(struct))
+        except TypeError:  # not plain schema content, never shared
+            return build()
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.saved += self.sizes[key]
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        value = build()  # outside the lock, builds intern their own parts
+        size = footprint(value)
+        with self.lock:
+            if key in self.entries:  # another thread got there first
+                self.hits += 1
+                self.saved += self.sizes[key]
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+            self.entries[key] = value
+            self.sizes[key] = size
+            while len(self.entries) > self.maxsize:  # users keep their copy
+                del self.sizes[self.entries.popitem(last=False)[0]]
+            return value
+
+    def stats(self) -> InternStats:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return InternStats(
+                len(self.entries), self.hits, self.misses,
+                self.hits / lookups if lookups else 0.0, self.saved)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.hits = self.misses = self.saved = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+INTERN_TABLE = InternTable()
@@ -0,0 +1,93 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from collections import Counter, defaultdict
+from threading import Lock
+from time import perf_counter
+from typing import Callable
+
+
+def model_counters() -> dict:
+    return {
+        'built': 0,
+        'failed': 0,
+        'seconds': 0.0,
+        'failures': Counter(),
+        'keywords': defaultdict(lambda: [0, 0.0]),
+    }
+
+
+def freeze(counters: dict) -> dict:
+    failures = defaultdict(dict)
+    for (exc, keyword), n in counters['failures'].items():
+        failures[exc][keyword] = n
+    return {
+        'built': counters['built'],
+        'failed': counters['failed'],
+        'seconds': counters['seconds'],
+        'failures': dict(failures),
+        'keywords': {
+            keyword: {'calls': calls, 'seconds': seconds}
+            for keyword, (calls, seconds) in counters['keywords'].items()},
+    }
+
+
+class Metrics:
+    clock = staticmethod(perf_counter)
+
+    def __init__(self, hooks=(), every: int = 0):
+        self.hooks = list(hooks)
+        self.every = every
+        self.lock = Lock()
+        self.models = defaultdict(model_counters)
+        self.pending = 0
+
+    def add_hook(self, hook: Callable):
+        self.hooks.append(hook)
+        return hook
+
+    def keyword(self, model: str, keyword: str, seconds: float):
+        with self.lock:
+            counter = self.models[model]['keywords'][keyword]
+            counter[0] += 1
+            counter[1] += seconds
+
+    def built(self, model: str, seconds: float):
+        with self.lock:
+            counters = self.models[model]
+            counters['built'] += 1
+            counters['seconds'] += seconds
+        self.tick()
+
+    def failed(self, model: str, keyword: str, exc: BaseException,
+               seconds: float):
+        with self.lock:
+            counters = self.models[model]
+            counters['failed'] += 1
+            counters['seconds'] += seconds
+            counters['failures'][(type(exc).__name__, keyword)] += 1
+        self.tick()
+
+    def tick(self):
+        if not self.every:
+            return
+        with self.lock:
+            self.pending += 1
+            due, self.pending = divmod(self.pending, self.every)
+        if due:
+            self.publish()
+
+    def snapshot(self, reset: bool = False) -> dict:
+        with self.lock:
+            models, self.models = self.models, (
+                defaultdict(model_counters) if reset else self.models)
+            return {model: freeze(c) for model, c in models.items()}
+
+    def reset(self):
+        self.snapshot(reset=True)
+
+    def publish(self, reset: bool = False) -> dict:
+        snapshot = self.snapshot(reset)
+        for hook in self.hooks:
+            hook(snapshot)
+        return snapshot
@@ -0,0 +1,153 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from hashlib import sha256
+from mmap import mmap, ACCESS_READ
+from operator import attrgetter
+from struct import Struct, error as StructError
+import json
+
+import schemamodels as sm
+
+
+MAGIC = b'SMPK'
+
+VERSION = 1
+
+HEADER = Struct('<4sB3xI32s')  # magic, version, record size, layout digest
+
+SCALAR_CODES = {'integer': 'q', 'number': 'd', 'boolean': '?'}
+
+EXACT_TYPES = {'q': int, 'd': float, '?': bool}  # strings are str
+
+
+def field_code(struct: dict):
+    if struct.get('type') in SCALAR_CODES:
+        return SCALAR_CODES[struct['type']]
+    if struct.get('type') == 'string' and 'maxLength' in struct:
+        capacity = 4 * struct['maxLength']  # utf-8 needs at most 4 bytes
+        return f'{"H" if capacity < 1 << 16 else "I"}{capacity}s'
+    return None
+
+
+def decoder(codes: tuple):
+    if not any(code.endswith('s') for code in codes):
+        return tuple
+    parts, i = list(), 0
+    for code in codes:  # a string is unpacked as (length, padded bytes)
+        if code.endswith('s'):
+            parts.append(f"r[{i + 1}][:r[{i}]].decode('utf-8')")
+            i += 2
+        else:
+            parts.append(f'r[{i}]')
+            i += 1
+    source = f'def decode(r):\n    return ({", ".join(parts)}, )\n'
+    return sm.compile_function(
+        source, {}, 'decode', f'<schemamodels decoder {"".join(codes)}>')
+
+
+class Layout:
+    def __init__(self, names: tuple, codes: tuple, schema: dict):
+        self.names = names
+        self.struct = Struct('<' + ''.join(codes))
+        self.strings = frozenset(
+            i for i, code in enumerate(codes) if code.endswith('s'))
+        self.types = tuple(EXACT_TYPES.get(code, str) for code in codes)
+        self.decode = decoder(codes)
+        self.getter = attrgetter(*names)
+        canonical = json.dumps(schema, sort_keys=True, separators=(',', ':'))
+        self.digest = sha256(
+            f'{self.struct.format}|{canonical}'.encode('utf-8')).digest()
+
+    def pack(self, instance) -> bytes:
+        values = self.getter(instance)
+        if len(self.names) == 1:
+            values = (values, )
+        for name, kind, value in zip(self.names, self.types, values):
+            if type(value) is not kind:  # True would come back as 1, 2 as 2.0
+                raise ValueError(
+                    f'{type(instance).__name__}.{name} is a '
+                    f'{type(value).__name__}, its packed layout holds '
+                    f'{kind.__name__}')
+        try:
+            return self.struct.pack(*self.arguments(values))
+        except StructError as err:  # e.g. an integer wider than 64 bits
+            raise ValueError(
+                f'{type(instance).__name__} does not fit its packed '
+                f'layout: {err}') from None
+
+    def arguments(self, values: tuple) -> tuple:
+        if not self.strings:
+            return values
+        args = list()
+        for i, value in enumerate(values):
+            if i in self.strings:
+                value = value.encode('utf-8')
+                args.append(len(value))
+            args.append(value)
+        return args
+
+    def header(self) -> bytes:
+        return HEADER.pack(MAGIC, VERSION, self.struct.size, self.digest)
+
+    def check_header(self, buffer):
+        if len(buffer) < HEADER.size:
+            raise ValueError('not a schemamodels record file')
+        magic, version, size, digest = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a schemamodels record file')
+        if size != self.struct.size or digest != self.digest:
+            raise ValueError('record file was written for another schema')
+
+
+def layout(names: tuple, schema: dict):
+    codes = tuple(field_code(schema['properties'][n]) for n in names)
+    return Layout(names, codes, schema) if all(codes) else None
+
+
+def require_layout(klass) -> Layout:
+    if klass._layout is None:
+        raise TypeError(
+            f'{klass.__name__} is not fixed-shape; packed records need '
+            'integer, number, boolean or maxLength-bounded string fields')
+    return klass._layout
+
+
+def build(klass, names: tuple, values: tuple, validate: bool):
+    if validate:
+        return klass(**dict(zip(names, values)))
+    return klass.from_trusted_tuple(values)
+
+
+def tobytes(self) -> bytes:
+    return require_layout(type(self)).pack(self)
+
+
+def frombytes(klass, buffer, validate: bool = True):
+    layout = require_layout(klass)
+    values = layout.decode(layout.struct.unpack_from(buffer))
+    return build(klass, layout.names, values, validate)
+
+
+def write_records(klass, fp, instances, header: bool = True) -> int:
+    layout, n = require_layout(klass), 0
+    if header:
+        fp.write(layout.header())
+    for instance in instances:
+        fp.write(layout.pack(instance))
+        n += 1
+    return n
+
+
+def read_records(klass, path, validate: bool = True):
+    layout = require_layout(klass)
+    with open(path, 'rb') as fp, mmap(fp.fileno(), 0, access=ACCESS_READ) as m:
+        view = memoryview(m)
+        try:
+            layout.check_header(view)  # only our own files may skip checks
+            body = view[HEADER.size:]
+            for raw in layout.struct.iter_unpack(body):
+                yield build(klass, layout.names, layout.decode(raw), validate)
+        finally:
+            body = raw = None
+            view.release()
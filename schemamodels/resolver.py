@@ -0,0 +1,116 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import json
+from pathlib import Path
+from urllib.parse import urljoin, urlparse, unquote
+from urllib.request import url2pathname
+
+from schemamodels import exceptions as e
+
+
+LITERAL_KEYWORDS = {'enum', 'const', 'default', 'examples'}
+
+DEFINITION_KEYWORDS = {'$defs', 'definitions'}
+
+ANNOTATION_KEYWORDS = {'title', 'description', 'default'}
+
+
+def as_uri(base: str) -> str:
+    if not base or urlparse(base).scheme:
+        return base
+    return Path(base).resolve().as_uri()
+
+
+def join(base: str, ref: str) -> str:
+    if ref.startswith('#'):  # urljoin ignores fragments on urn: bases
+        return base.partition('#')[0] + ref
+    return urljoin(base, ref)
+
+
+def merge_subschema(struct: dict, subschema: dict) -> dict:
+    if (struct.keys() & subschema.keys()) - ANNOTATION_KEYWORDS:  # keep both
+        return {**struct, 'allOf': [*struct.get('allOf', []), subschema]}
+    return {**subschema, **struct}
+
+
+def pointer(document, fragment: str):
+    node = document
+    for token in filter(None, unquote(fragment).split('/')):
+        token = token.replace('~1', '/').replace('~0', '~')
+        try:
+            node = node[int(token) if isinstance(node, list) else token]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise e.UnresolvableReferenceError(f"no {fragment!r} in document")
+    return node
+
+
+class Resolver:
+
+    def __init__(self):
+        self.documents = dict()
+        self.resolved = dict()
+        self.active = set()
+
+    def add(self, document: dict, *uris: str):
+        for uri in filter(None, uris):
+            self.documents[uri.partition('#')[0]] = document
+
+    def load(self, uri: str) -> dict:
+        if uri not in self.documents:
+            parsed = urlparse(uri)
+            if parsed.scheme != 'file':
+                raise e.UnresolvableReferenceError(f"cannot load {uri!r}")
+            path = Path(url2pathname(parsed.path))
+            try:
+                document = json.loads(path.read_text(encoding='utf-8'))
+            except OSError as err:
+                raise e.UnresolvableReferenceError(str(err))
+            self.add(document, uri, document.get('$id'))
+        return self.documents[uri]
+
+    def resolve(self, ref: str, base: str) -> dict:
+        uri = join(base, ref)
+        if uri in self.resolved:
+            return self.resolved[uri]
+        if uri in self.active:
+            raise e.UnresolvableReferenceError(f"recursive $ref {uri!r}")
+        doc_uri, _, fragment = uri.partition('#')
+        self.active.add(uri)
+        try:
+            document = self.load(doc_uri)
+            target = self.inline(pointer(document, fragment), doc_uri)
+        finally:
+            self.active.discard(uri)
+        if isinstance(target, dict) and 'properties' in target:
+            name = fragment.rstrip('/').rpartition('/')[2]
+            target.setdefault('title', name or Path(doc_uri).name)
+        self.resolved[uri] = target
+        return target
+
+    def inline_keyword(self, k: str, v, base: str):
+        if k in LITERAL_KEYWORDS:
+            return v
+        if k == 'properties':
+            return {name: self.inline(s, base) for name, s in v.items()}
+        return self.inline(v, base)
+
+    def inline(self, struct, base: str):
+        if isinstance(struct, list):
+            return [self.inline(s, base) for s in struct]
+        if not isinstance(struct, dict):
+            return struct
+        base = join(base, struct['$id']) if '$id' in struct else base
+        resolved = {
+            k: self.inline_keyword(k, v, base)
+            for k, v in struct.items()
+            if k not in DEFINITION_KEYWORDS and k != '$ref'
+        }
+        if '$ref' not in struct:
+            return resolved
+        target = self.resolve(struct['$ref'], base)
+        return merge_subschema(resolved, target) if resolved else target
+
+    def inline_root(self, schema: dict, base: str) -> dict:
+        self.add(schema, base, schema.get('$id'))
+        return self.inline(schema, base)
@@ -0,0 +1,274 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from dataclasses import fields, MISSING
+from math import isfinite
+from pathlib import Path
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+import json
+import linecache
+import re
+
+import schemamodels as sm
+
+
+PRELUDE = '''\
+# Generated by `python -m schemamodels compile`. Do not edit.
+import copy
+import dataclasses
+import json
+{imports}
+from schemamodels import exceptions as e
+
+_missing = dataclasses.MISSING
+_V = schemamodels.Violation
+_m = _clock = None
+_new = object.__new__
+_set = object.__setattr__
+_dumps = json.JSONEncoder(separators=(',', ':')).encode
+_str = json.encoder.encode_basestring_ascii
+_inf = float('inf')
+
+
+def _deep(v, export):
+    if hasattr(type(v), '_schema'):
+        return export(v)
+    if isinstance(v, (list, tuple)):
+        return type(v)(_deep(x, export) for x in v)
+    if isinstance(v, dict):
+        return {{_deep(k, export): _deep(x, export) for k, x in v.items()}}
+    return copy.deepcopy(v)
+
+
+def asdict(obj):
+    return {{k: _deep(getattr(obj, k), asdict) for k in obj.__slots__}}
+
+
+def astuple(obj):
+    return tuple(_deep(getattr(obj, k), astuple) for k in obj.__slots__)
+'''
+
+METHODS = '''\
+def __repr__(self):
+    return f'{name}({fields})'
+
+def __eq__(self, other):
+    if other.__class__ is self.__class__:
+        return {values} == {others}
+    return NotImplemented
+
+def __hash__(self):
+    return hash({values})
+
+def __setattr__(self, name, value):
+    raise dataclasses.FrozenInstanceError(f'cannot assign to field {{name!r}}')
+
+def __delattr__(self, name):
+    raise dataclasses.FrozenInstanceError(f'cannot delete field {{name!r}}')
+
+def __getstate__(self):
+    return {values}
+
+def __setstate__(self, state):
+    for name, value in zip(self.__slots__, state):
+        _set(self, name, value)
+
+'''
+
+CLASSMETHODS = (
+    'check', 'is_valid', 'trusted', 'from_trusted_tuple', 'write_csv',
+    'write_ndjson', 'from_records', 'iter_ndjson', 'iter_json_array',
+    'avalidate_many')
+
+SHARED = ('tocsv', 'write_csv', 'write_ndjson', 'from_records', 'iter_ndjson',
+          'iter_json_array', 'avalidate_many')
+
+
+def indent(source: str, prefix: str = '    ') -> str:
+    return ''.join(
+        prefix + line if line.strip() else line
+        for line in source.splitlines(True))
+
+
+def literal(value) -> str:  # repr, but the module must also read back inf
+    if type(value) is float and not isfinite(value):
+        return f'float({str(value)!r})'
+    if type(value) is dict:
+        return '{' + ', '.join(
+            f'{literal(k)}: {literal(v)}' for k, v in value.items()) + '}'
+    if type(value) is list:
+        return f'[{", ".join(map(literal, value))}]'
+    return repr(value)
+
+
+def spaced(source: str) -> str:
+    return re.sub(r'\n(?=def )', '\n\n', source)
+
+
+def is_model(value) -> bool:
+    return isinstance(value, type) and (
+        value.__module__ == 'schemamodels.dynamic')
+
+
+class SourceBinder:
+    """Binds constants as module level names in the emitted source."""
+
+    def __init__(self):
+        self.names = dict()
+        self.keep = list()
+        self.lines = list()
+        self.exprs = dict()
+        self.factories = dict()
+        self.imports = {'schemamodels'}
+
+    def __call__(self, value) -> str:
+        if value is None or type(value) in (bool, int, str) or (
+                type(value) is float and isfinite(value)):
+            return repr(value)
+        if is_model(value):
+            return value.__name__  # defined further down the module
+        if id(value) not in self.names:
+            expr = self.expression(value)
+            if expr not in self.exprs:  # equal constants are emitted once
+                self.exprs[expr] = name = f'_k{len(self.exprs)}'
+                self.lines.append(f'{name} = {expr}\n')
+            self.names[id(value)] = self.exprs[expr]
+            self.keep.append(value)
+        return self.names[id(value)]
+
+    def expression(self, value) -> str:
+        if type(value) is float:
+            return literal(value)
+        if isinstance(value, (frozenset, set)):
+            items = sorted(map(self, value))
+            return f'frozenset({{{", ".join(items)}}})' if items else (
+                'frozenset()')
+        if type(value) is tuple:
+            return f'({"".join(self(x) + ", " for x in value)})'
+        if type(value) is list:
+            return f'[{", ".join(map(self, value))}]'
+        if type(value) is dict:
+            return '{' + ', '.join(
+                f'{self(k)}: {self(v)}' for k, v in value.items()) + '}'
+        if isinstance(value, re.Pattern):
+            return f're.compile({value.pattern!r}, {value.flags})'
+        if isinstance(value, ModuleType):
+            self.imports.add(value.__name__)
+            return value.__name__
+        if hasattr(value, '__recipe__'):
+            factory, args = value.__recipe__
+            return f'{self(factory)}({", ".join(map(self, args))})'
+        if isinstance(value, FunctionType) and value.__code__.co_filename in (
+                linecache.cache) and '<' in value.__code__.co_filename:
+            return self.compiled(value)
+        owner = getattr(value, '__self__', None)
+        if isinstance(value, (MethodType, BuiltinFunctionType)) and (
+                isinstance(owner, (type, re.Pattern))):
+            return f'{self(value.__self__)}.{value.__name__}'
+        return self.qualified(value)
+
+    def qualified(self, value) -> str:
+        module = getattr(value, '__module__', None)
+        qualname = getattr(value, '__qualname__', '<')
+        if module is None or '<' in qualname:
+            raise TypeError(f'cannot emit {value!r} as source')
+        if module == 'builtins':
+            return qualname
+        self.imports.add(module)
+        return f'{module}.{qualname}'
+
+    def compiled(self, fn: FunctionType) -> str:
+        filename = fn.__code__.co_filename
+        params = [  # the constants it was compiled with, minus its siblings
+            k for k, v in fn.__globals__.items()
+            if k != '__builtins__' and not (
+                isinstance(v, FunctionType)
+                and v.__code__.co_filename == filename)]
+        source = ''.join(linecache.getlines(filename))
+        if (source, *params) not in self.factories:
+            factory = f'_make{len(self.factories)}_{fn.__name__}'
+            self.factories[(source, *params)] = factory
+            self.lines.append(
+                f'\n\ndef {factory}({", ".join(params)}):\n'
+                + indent(source) + f'    return {fn.__name__}\n\n\n')
+        args = ', '.join(self(fn.__globals__[k]) for k in params)
+        return f'{self.factories[(source, *params)]}({args})'
+
+
+def init_source(entries: list, bind: SourceBinder) -> str:
+    params, lines = ['self'], list()
+    for name, _, f in entries:
+        if f.default is not MISSING:
+            params.append(f'{name}={bind(f.default)}')
+        elif f.default_factory is not MISSING:
+            params.append(f'{name}=_missing')
+            lines.append(f'    if {name} is _missing:\n')
+            lines.append(f'        {name} = {bind(f.default_factory)}()\n')
+        else:
+            params.append(name)
+    lines += [f'    _set(self, {name!r}, {name})\n' for name, _, _ in entries]
+    return (f'def __init__({", ".join(params)}):\n' + ''.join(lines)
+            + '    self.__post_init__()\n\n')
+
+
+def class_source(klass, bind: SourceBinder) -> str:
+    entries = [(f.name, f.type, f) for f in fields(klass)]
+    names = tuple(name for name, _, _ in entries)
+    schema = klass._schema
+    models = {name: t for name, t, _ in entries if is_model(t)}
+    validators, _, _, _ = sm.generate_class_source(
+        klass.__name__, schema['properties'], entries, models, bind)
+    values = f'({"".join(f"self.{n}, " for n in names)})'
+    methods = METHODS.format(
+        name=klass.__qualname__,
+        fields=', '.join(f'{n}={{self.{n}!r}}' for n in names),
+        values=values, others=values.replace('self.', 'other.'))
+    body = [
+        f'__slots__ = {names!r}\n',
+        '__match_args__ = __slots__\n',
+        f'_schema = {literal(schema)}\n',
+        f'_errorhandler = {bind(klass._errorhandler)}\n',
+        f'_renderer = {bind(klass._renderer)}\n',
+        f'_csv_fields = {klass._csv_fields!r}\n',
+        '_csv_row = schemamodels.row_getter(_csv_fields)\n',
+        *(f'{k} = schemamodels.{k}\n' for k in SHARED), '\n',
+        init_source(entries, bind), methods, spaced(validators), '\n',
+        spaced(sm.generate_export_source(names, models)
+               + sm.generate_json_source(names, schema['properties'], models)),
+        '\n', *(f'{k} = classmethod({k})\n' for k in CLASSMETHODS)]
+    return f'\n\nclass {klass.__name__}:\n' + indent(''.join(body))
+
+
+def dependency_order(classes: list) -> list:
+    ordered = dict()
+
+    def visit(klass):
+        for f in fields(klass):
+            if is_model(f.type):
+                visit(f.type)
+        ordered.setdefault(klass.__name__, klass)
+    for klass in classes:
+        visit(klass)
+    return list(ordered.values())
+
+
+def emit_module(classes: list) -> str:
+    bind = SourceBinder()
+    body = ''.join(class_source(k, bind) for k in dependency_order(classes))
+    imports = ''.join(f'import {m}\n' for m in sorted(bind.imports | {'re'}))
+    return (PRELUDE.format(imports=imports.rstrip('\n')) + '\n\n'
+            + ''.join(bind.lines) + body)
+
+
+def compile_schemas(paths, pattern: str = '*.schema.json') -> str:
+    factory = sm.SchemaModelFactory(cache=sm.ModelCache())
+    names = list()
+    for path in map(Path, paths):
+        if path.is_dir():
+            names += factory.load_directory(path, pattern, lazy=False)
+        else:
+            schema = json.loads(path.read_text(encoding='utf-8'))
+            uri = path.resolve().as_uri()
+            if factory.register(schema, lazy=False, base_uri=uri):
+                names.append(sm.generate_classname(schema['title']))
+    return emit_module([factory.get(name) for name in names])
@@ -0,0 +1,115 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import codecs
+import json
+from re import compile as re_compile
+
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+WHITESPACE = re_compile(r'[ \t\n\r]*')
+
+
+def check_buffer(size: int, max_buffer: int):
+    if max_buffer is not None and size > max_buffer:
+        raise ValueError(f"pending record exceeds max_buffer ({max_buffer})")
+
+
+def ndjson_lines(fp, chunk_size=DEFAULT_CHUNK_SIZE, max_buffer=None):
+    buffer, offset, lineno = b'', 0, 0
+    while True:
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        *lines, buffer = (buffer + chunk).split(b'\n')
+        for line in lines:
+            lineno += 1
+            if line.strip():
+                yield line, lineno, offset
+            offset += len(line) + 1
+        check_buffer(len(buffer), max_buffer)
+    if buffer.strip():
+        yield buffer, lineno + 1, offset
+
+
+def text_chunks(fp, chunk_size: int):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk if isinstance(chunk, str) else decoder.decode(chunk)
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+class JSONArrayReader:
+
+    def __init__(self, fp, chunk_size=DEFAULT_CHUNK_SIZE, max_buffer=None):
+        self.chunks = text_chunks(fp, chunk_size)
+        self.max_buffer = max_buffer
+        self.decoder = json.JSONDecoder()
+        self.buf, self.pos, self.offset, self.lineno = '', 0, 0, 1
+        self.eof = False
+
+    def fill(self) -> bool:
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def advance(self, end: int):
+        consumed = self.buf[self.pos:end]
+        self.offset += len(consumed.encode('utf-8'))
+        self.lineno += consumed.count('\n')
+        self.pos = end
+
+    def peek(self) -> str:
+        while True:
+            self.advance(WHITESPACE.match(self.buf, self.pos).end())
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise json.JSONDecodeError(
+                f"Expecting {chars!r}", self.buf, self.pos)
+        self.advance(self.pos + 1)
+        return c
+
+    def decode(self):
+        while True:
+            try:
+                item, end = self.decoder.raw_decode(self.buf, self.pos)
+                # a bare number at the end of the buffer may continue
+                if end < len(self.buf) or self.eof:
+                    return item, end
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # only the record being decoded counts, not what follows it
+            check_buffer(len(self.buf) - self.pos, self.max_buffer)
+            self.fill()
+
+    def __iter__(self):
+        self.expect('[')
+        if self.peek() == ']':
+            return
+        while True:
+            self.peek()
+            lineno, offset = self.lineno, self.offset
+            item, end = self.decode()
+            self.advance(end)
+            yield item, lineno, offset
+            if self.expect(',]') == ']':
+                return
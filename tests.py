@@ -4,6 +4,7 @@
 from jsonschema import validators
 import json
 import importlib
+import pickle
 from dataclasses import make_dataclass, FrozenInstanceError
 
 from schemamodels import SchemaModelFactory, exceptions, bases, COMPARISONS
@@ -664,3 +665,1225 @@ def test_export_funcs():
     assert e.todict() == {"handiness": "left", "brand_name": "abcd"}
     assert 'left' in e.tolist()
     assert 'abcd' in e.tolist()
+
+
+@pytest.mark.compiled
+def test_compiled_validator_precedence():
+    test = '''
+    {
+        "title": "compiled-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "rating": {
+              "type": "number",
+              "minimum": 0,
+              "maximum": 5
+            },
+            "brand_name": {
+              "type": "string",
+              "maxLength": 5
+            },
+            "provider_id": {
+                "oneOf": [
+                    { "type": "number", "multipleOf": 5 },
+                    { "type": "number", "multipleOf": 3 },
+                    { "type": "number", "multipleOf": 2 }
+                ]
+            }
+        }
+    }
+    '''
+    t = json.loads(test)
+    sm = SchemaModelFactory()
+    sm.register(t)
+
+    from schemamodels.dynamic import CompiledSchema
+    assert CompiledSchema.__post_init__.__code__.co_filename == '<schemamodels CompiledSchema validator>'
+
+    CompiledSchema(rating=3, brand_name="abc", provider_id=5)
+    with pytest.raises(exceptions.ValueTypeViolation):
+        CompiledSchema(rating=30, brand_name=1, provider_id=5)
+    with pytest.raises(exceptions.RangeConstraintViolation):
+        CompiledSchema(rating=30, brand_name="abcdefgh", provider_id=5)
+    with pytest.raises(exceptions.SubSchemaFailureViolation):
+        CompiledSchema(rating="a", brand_name="abc", provider_id=30)
+
+
+@pytest.mark.optimizer
+def test_constraint_optimizer():
+    from schemamodels import optimize_subschema
+
+    assert optimize_subschema({"type": "string", "enum": ["left", "right"], "maxLength": 5}) == {"type": "string", "enum": frozenset(["left", "right"])}
+    assert optimize_subschema({"type": "number", "minimum": 0, "exclusiveMinimum": 0, "maximum": 5}) == {"type": "number", "interval": (0, True, 5, False)}
+    assert optimize_subschema({"type": "integer", "multipleOf": 1, "anyOf": [{"type": "string"}, {}]}) == {"type": "integer"}
+    assert optimize_subschema({"enum": [[1], [2]]}) == {"enum": ([1], [2])}
+
+    test = {
+        "title": "optimized-schema",
+        "type": "object",
+        "properties": {
+            "country": {"type": "string", "enum": ["C%03d" % i for i in range(500)]},
+            "rating": {"type": "number", "minimum": 0, "exclusiveMaximum": 5}
+        }
+    }
+    sm = SchemaModelFactory()
+    sm.register(test)
+
+    from schemamodels.dynamic import OptimizedSchema
+    OptimizedSchema(country="C499", rating=0)
+    with pytest.raises(exceptions.ValueTypeViolation):
+        OptimizedSchema(country="C500", rating=1)
+    with pytest.raises(exceptions.ValueTypeViolation):
+        OptimizedSchema(country=1, rating=1)
+    with pytest.raises(exceptions.RangeConstraintViolation):
+        OptimizedSchema(country="C001", rating=5)
+
+
+@pytest.mark.optimizer
+def test_enum_with_unhashable_values():
+    test = {
+        "title": "unhashable-enum-schema",
+        "type": "object",
+        "properties": {
+            "handiness": {"type": "string", "enum": ["left", "right"]},
+            "side": {"enum": ["left", "right"]}
+        }
+    }
+    sm = SchemaModelFactory()
+    sm.register(test)
+    from schemamodels.dynamic import UnhashableEnumSchema
+
+    for value in (["left"], {"left": 1}):
+        with pytest.raises(exceptions.ValueTypeViolation):
+            UnhashableEnumSchema(handiness=value, side="left")
+        with pytest.raises(exceptions.ValueTypeViolation):
+            UnhashableEnumSchema(handiness="left", side=value)
+        assert [v.keyword for v in UnhashableEnumSchema.check(handiness=value, side="left")] == ['type']
+        assert not UnhashableEnumSchema.is_valid(handiness="left", side=value)
+
+    sm.register({"title": "interval-keyword", "type": "object", "properties": {  # an unknown keyword to JSON Schema, ignored
+        "every": {"type": "number", "interval": "daily", "minimum": 0},
+        "either": {"anyOf": [{"type": "string", "interval": "weekly"}, {"type": "null"}]}}})
+    from schemamodels.dynamic import IntervalKeyword
+    assert IntervalKeyword(every=1.5, either="x").every == 1.5
+    with pytest.raises(exceptions.RangeConstraintViolation):
+        IntervalKeyword(every=-1)
+
+
+@pytest.mark.batch
+def test_from_records():
+    test = '''
+    {
+        "title": "batch-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "rating": {
+              "type": "number",
+              "minimum": 0,
+              "maximum": 5
+            },
+            "brand_name": {
+              "type": "string"
+            }
+        },
+        "required": ["brand_name"]
+    }
+    '''
+    t = json.loads(test)
+    sm = SchemaModelFactory()
+    sm.register(t)
+
+    from schemamodels.dynamic import BatchSchema
+    records = [
+        {"rating": 1, "brand_name": "a"},
+        {"rating": 10, "brand_name": "b"},
+        {"rating": 2},
+        {"rating": 3, "brand_name": "c"},
+    ]
+
+    stream = BatchSchema.from_records(iter(records))
+    assert next(stream).brand_name == "a"
+    with pytest.raises(exceptions.RangeConstraintViolation):
+        next(stream)
+
+    assert [r.brand_name for r in BatchSchema.from_records(records, on_error='skip')] == ["a", "c"]
+
+    errors = []
+    assert len(list(BatchSchema.from_records(records, on_error='collect', errors=errors))) == 2
+    assert [i for i, _ in errors] == [1, 2]
+    assert isinstance(errors[0][1], exceptions.RangeConstraintViolation)
+    assert isinstance(errors[1][1], TypeError)
+
+    with pytest.raises(ValueError):
+        BatchSchema.from_records(records, on_error='collect')
+    with pytest.raises(ValueError):
+        BatchSchema.from_records(records, on_error='ignore')
+
+
+@pytest.mark.columnar
+def test_optional_imports_are_deferred():
+    import os
+    import subprocess
+    import sys
+    probe = 'import sys, schemamodels; print(sorted({"numpy", "asyncio"} & set(sys.modules)))'
+    out = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert out.stdout.strip() == '[]'
+
+
+@pytest.mark.columnar
+def test_validate_columns():
+    np = pytest.importorskip("numpy")
+    test = '''
+    {
+        "title": "column-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "price": {
+              "type": "number",
+              "minimum": 0,
+              "exclusiveMaximum": 100
+            },
+            "qty": {
+              "type": "integer",
+              "multipleOf": 5
+            },
+            "handiness": {
+              "type": "string",
+              "enum": ["left", "right"],
+              "maxLength": 5
+            },
+            "tag": {
+              "anyOf": [{"type": "integer"}, {"type": "null"}]
+            }
+        }
+    }
+    '''
+    t = json.loads(test)
+    sm = SchemaModelFactory()
+    sm.register(t)
+
+    from schemamodels.dynamic import ColumnSchema
+    report = ColumnSchema.validate_columns({
+        'price': np.array([1.5, -1.0, 100.0]),
+        'qty': np.array([5, 7, 10]),
+        'handiness': np.array(["left", "up", "right"]),
+        'tag': [1, None, "x"],
+    })
+    assert report['price']['minimum'].tolist() == [False, True, False]
+    assert report['price']['exclusiveMaximum'].tolist() == [False, False, True]
+    assert not report['price']['type'].any()
+    assert report['qty']['multipleOf'].tolist() == [False, True, False]
+    assert report['handiness']['enum'].tolist() == [False, True, False]
+    assert report['tag']['anyOf'].tolist() == [False, False, True]
+
+    report = ColumnSchema.validate_columns({'qty': np.array([1.5, 5.0])}, indices=True)
+    assert report['qty']['type'].tolist() == [0, 1]
+    assert report['qty']['multipleOf'].tolist() == [0]
+
+    with pytest.raises(TypeError):
+        ColumnSchema.validate_columns({'nope': np.array([1])})
+
+
+@pytest.mark.streaming
+def test_streaming_ingestion():
+    import io
+    test = '''
+    {
+        "title": "stream-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "rating": {
+              "type": "number",
+              "minimum": 0,
+              "maximum": 5
+            },
+            "brand_name": {
+              "type": "string"
+            }
+        }
+    }
+    '''
+    t = json.loads(test)
+    sm = SchemaModelFactory()
+    sm.register(t)
+
+    from schemamodels.dynamic import StreamSchema
+    ndjson = '{"rating": 1, "brand_name": "é"}\n\n{"rating": 9}\n{"rating": 2\n{"rating": 3}'.encode()
+
+    rows = list(StreamSchema.iter_ndjson(io.BytesIO(ndjson), on_error='skip', chunk_size=4))
+    assert [r.rating for r in rows] == [1, 3]
+
+    errors = []
+    list(StreamSchema.iter_ndjson(io.BytesIO(ndjson), on_error='collect', errors=errors, chunk_size=5))
+    assert [(i, err.lineno, err.offset) for i, err in errors] == [(1, 3, 35), (2, 4, 49)]
+    assert isinstance(errors[0][1], exceptions.RangeConstraintViolation)
+
+    array = '[\n  {"rating": 1, "brand_name": "é"},\n  {"rating": 7},\n  {"rating": 4.5}\n]'
+    for fp in (io.BytesIO(array.encode()), io.StringIO(array)):
+        errors = []
+        rows = list(StreamSchema.iter_json_array(fp, on_error='collect', errors=errors, chunk_size=3))
+        assert [r.rating for r in rows] == [1, 4.5]
+        assert [(i, err.lineno, err.offset) for i, err in errors] == [(1, 3, 41)]
+
+    with pytest.raises(exceptions.RangeConstraintViolation):
+        list(StreamSchema.iter_json_array(io.StringIO(array)))
+    with pytest.raises(ValueError):
+        list(StreamSchema.iter_json_array(io.StringIO('[{"rating": 1} {"rating": 2}]')))
+    with pytest.raises(ValueError, match='max_buffer'):
+        list(StreamSchema.iter_json_array(io.StringIO(array), chunk_size=2, max_buffer=8))
+    small = [{"brand_name": str(i)} for i in range(2000)]  # a chunk holds many records, each fits max_buffer
+    assert len(list(StreamSchema.iter_json_array(io.StringIO(json.dumps(small)), max_buffer=100))) == 2000
+    assert len(list(StreamSchema.iter_ndjson(io.StringIO('\n'.join(map(json.dumps, small))), max_buffer=100))) == 2000
+    assert list(StreamSchema.iter_json_array(io.StringIO(' [ ] '))) == []
+
+
+@pytest.mark.export
+def test_write_csv():
+    import io
+    test = '''
+    {
+        "title": "csv-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "brand_name": {
+              "type": "string"
+            },
+            "rating": {
+              "type": "number"
+            }
+        }
+    }
+    '''
+    t = json.loads(test)
+    sm = SchemaModelFactory()
+    sm.register(t)
+
+    from schemamodels.dynamic import CsvSchema
+    rows = [CsvSchema(brand_name="a,b", rating=1.5), CsvSchema(brand_name="c", rating=2)]
+
+    fp = io.StringIO()
+    CsvSchema.write_csv(iter(rows), fp)
+    assert fp.getvalue() == 'brand_name,rating\n"a,b",1.5\nc,2\n'
+
+    fp = io.StringIO()
+    CsvSchema.write_csv(rows, fp, header=False, fields=['rating'])
+    assert fp.getvalue() == '1.5\n2\n'
+
+    assert rows[1].tocsv() == 'c,2'
+    assert rows[1].tocsv(header=True, fields=['rating']) == 'rating\n2'
+
+
+@pytest.mark.export
+def test_shallow_exports():
+    test = '''
+    {
+        "title": "export-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "brand_name": {
+              "type": "string"
+            },
+            "tags": {
+              "type": "array"
+            }
+        }
+    }
+    '''
+    t = json.loads(test)
+    sm = SchemaModelFactory()
+    sm.register(t)
+
+    from schemamodels.dynamic import ExportSchema
+    tags = ["a", "b"]
+    ex = ExportSchema(brand_name="x", tags=tags)
+
+    assert ex.todict() == {"brand_name": "x", "tags": ("a", "b")}
+    assert ex.todict()["tags"] is ex.tags
+    assert ex.todict(deep=True) == ex.todict()
+    assert ex.tolist() == list(ex.totuple())
+    assert ex.tolist(deep=True) == ex.tolist()
+    assert ex.totuple()[ex.tolist().index(ex.tags)] is ex.tags
+    assert ex.totuple(deep=True) == ex.totuple()
+
+
+@pytest.mark.cache
+def test_registration_cache():
+    from schemamodels import ModelCache
+
+    test = '''
+    {
+        "title": "cached-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "brand_name": {
+              "type": "string"
+            }
+        }
+    }
+    '''
+    lib = importlib.import_module('schemamodels.dynamic')
+    cache = ModelCache(maxsize=2)
+
+    SchemaModelFactory(schemas=[json.loads(test)], cache=cache)
+    first = lib.CachedSchema
+    SchemaModelFactory(schemas=[json.loads(test)], cache=cache)
+    assert lib.CachedSchema is first
+    assert len(cache) == 1
+
+    class OtherRenderer(bases.BaseRenderer):
+        @classmethod
+        def apply(cls, f):
+            return f
+
+    other = SchemaModelFactory(renderer=OtherRenderer, cache=cache)
+    other.register(json.loads(test))
+    assert lib.CachedSchema is not first
+    assert len(cache) == 2
+
+    sm = SchemaModelFactory(cache=cache)
+    assert sm.invalidate(json.loads(test))
+    assert not sm.invalidate(json.loads(test))
+    sm.register(json.loads(test))
+    assert lib.CachedSchema is not first
+
+    reordered = json.loads(test)
+    reordered = dict(reversed(list(reordered.items())))
+    sm.register(reordered)
+    assert len(cache) == 2
+
+    other.register({**json.loads(test), "title": "evicting-schema"})
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+@pytest.mark.lazy
+def test_lazy_registration(tmp_path):
+    test = '''
+    {
+        "title": "lazy-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "brand_name": {
+              "type": "string",
+              "maxLength": 5
+            }
+        }
+    }
+    '''
+    lib = importlib.import_module('schemamodels.dynamic')
+    sm = SchemaModelFactory(schemas=[json.loads(test)], lazy=True)
+    assert 'LazySchema' not in vars(lib)
+
+    from schemamodels.dynamic import LazySchema
+    assert 'LazySchema' in vars(lib)
+    assert sm.get('LazySchema') is LazySchema
+    assert sm.get('lazy-schema') is LazySchema
+    with pytest.raises(exceptions.LengthConstraintViolation):
+        LazySchema(brand_name="abcdefgh")
+
+    for i in range(3):
+        schema = json.loads(test)
+        schema['title'] = f'lazy-dir-{i}'
+        (tmp_path / f'lazy{i}.schema.json').write_text(json.dumps(schema))
+    (tmp_path / 'ignored.json').write_text(test)
+
+    assert sm.load_directory(tmp_path) == ['LazyDir0', 'LazyDir1', 'LazyDir2']
+    assert 'LazyDir1' not in vars(lib)
+    assert sm.get('LazyDir1')(brand_name="abc").brand_name == "abc"
+    assert 'LazyDir0' not in vars(lib)
+
+    assert sm.load_directory(tmp_path, lazy=False) == ['LazyDir0', 'LazyDir1', 'LazyDir2']
+    assert 'LazyDir0' in vars(lib)
+    assert not hasattr(lib, 'NeverRegistered')
+
+
+@pytest.mark.refs
+def test_refs_and_nested_models(tmp_path):
+    shared = '''
+    {
+        "$id": "https://schema.dev/shared.schema.json",
+        "$defs": {
+            "money": {
+                "type": "object",
+                "properties": {
+                    "amount": {"type": "number", "minimum": 0},
+                    "currency": {"$ref": "#/$defs/currency"}
+                },
+                "required": ["amount"]
+            },
+            "currency": {"type": "string", "enum": ["USD", "EUR"], "default": "USD"}
+        }
+    }
+    '''
+    product = '''
+    {
+        "title": "ref-product",
+        "type": "object",
+        "properties": {
+            "price": {"$ref": "shared.json#/$defs/money"},
+            "cost": {"$ref": "shared.json#/$defs/money"},
+            "ship_to": {"$ref": "#/$defs/address"},
+            "sku": {"$ref": "#/$defs/sku"}
+        },
+        "required": ["price"],
+        "$defs": {
+            "address": {
+                "type": "object",
+                "properties": {
+                    "city": {"type": "string", "maxLength": 10}
+                }
+            },
+            "sku": {"type": "string", "minLength": 3}
+        }
+    }
+    '''
+    (tmp_path / 'shared.json').write_text(shared)
+    (tmp_path / 'product.schema.json').write_text(product)
+    lib = importlib.import_module('schemamodels.dynamic')
+    sm = SchemaModelFactory()
+    assert sm.load_directory(tmp_path) == ['RefProduct']
+
+    from schemamodels.dynamic import RefProduct, RefProductMoney as Money, RefProductAddress as Address
+    p = RefProduct(price={"amount": 3}, sku="abc", ship_to={"city": "Nashville"})
+    assert type(p.price) is Money
+    assert p.price.currency == "USD"
+    assert type(RefProduct(price={"amount": 3}, cost={"amount": 2}, sku="abc").cost) is Money
+    assert type(p.ship_to) is Address
+    assert p.cost is None
+    assert RefProduct.is_valid(price={"amount": 3}, cost=None, sku="abc")
+    assert not RefProduct.is_valid(price=None, sku="abc")  # only optional nested models may be None
+    assert RefProduct.check(price=None, sku="abc") == (('price', 'type', None),)
+    assert RefProduct.check(price={1: 2}, sku="abc") == (('price', 'type', {1: 2}),)
+    assert not RefProduct.is_valid(price={1: 2}, sku="abc")
+    assert p.todict() == {"price": {"amount": 3, "currency": "USD"}, "cost": None, "ship_to": {"city": "Nashville"}, "sku": "abc"}
+    assert RefProduct(price=p.price, sku="abc").price is p.price
+
+    with pytest.raises(exceptions.RangeConstraintViolation):
+        RefProduct(price={"amount": -1}, sku="abc")
+    with pytest.raises(exceptions.ValueTypeViolation):
+        RefProduct(price={"amount": 1, "currency": "GBP"}, sku="abc")
+    with pytest.raises(exceptions.ValueTypeViolation):
+        RefProduct(price=5, sku="abc")
+    with pytest.raises(exceptions.LengthConstraintViolation):
+        RefProduct(price={"amount": 1}, sku="ab")
+    with pytest.raises(exceptions.LengthConstraintViolation):
+        RefProduct(price={"amount": 1}, sku="abc", ship_to={"city": "Murfreesboro"})
+
+    other = json.loads(product)
+    other['title'] = 'ref-other'
+    sm.register(other, base_uri=str(tmp_path / 'product.schema.json'))
+    assert lib.RefOther(price={"amount": 1}, sku="abc").price.__class__ is Money
+    assert sm.invalidate(other, base_uri=str(tmp_path / 'product.schema.json'))
+    assert not sm.invalidate(other, base_uri=str(tmp_path / 'product.schema.json'))
+
+    with pytest.raises(exceptions.UnresolvableReferenceError):
+        sm.register({"title": "broken-ref", "type": "object", "properties": {"a": {"$ref": "#/$defs/missing"}}})
+
+    for title, amount in (("ref-first", "number"), ("ref-second", "string")):
+        sm.register({"title": title, "type": "object", "$defs": {"money": {"type": "object", "properties": {"amt": {"type": amount}}}},
+                     "properties": {"p": {"$ref": "#/$defs/money"}}})
+    first, second = lib.RefFirst(p={"amt": 1.5}), lib.RefSecond(p={"amt": "1.5"})
+    assert type(first.p) is lib.RefFirstMoney and type(second.p) is lib.RefSecondMoney
+    assert pickle.loads(pickle.dumps(first)) == first and pickle.loads(pickle.dumps(second)) == second
+
+    sm.register({"title": "sibling-ref", "type": "object", "$defs": {"pos": {"type": "integer", "minimum": 0}},
+                 "properties": {"n": {"$ref": "#/$defs/pos", "minimum": -5, "description": "both minimums apply"}}})
+    assert lib.SiblingRef(n=0).n == 0
+    with pytest.raises(exceptions.SubSchemaFailureViolation):  # the referenced minimum, kept as an allOf branch
+        lib.SiblingRef(n=-3)
+
+    import warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')  # a SyntaxWarning from the generated source
+        sm.register({"title": "car", "type": "object", "properties": {"model": {"type": "string", "model": "sedan"}}})
+    assert lib.Car(model="sedan").model == "sedan"  # an unknown keyword, not a nested model
+
+
+@pytest.mark.string
+def test_pattern_and_format_support():
+    from schemamodels.formats import compile_pattern, FORMAT_CHECKERS
+
+    test = '''
+    {
+        "title": "pattern-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "sku": {"type": "string", "pattern": "^[A-Z]{3}-\\\\d+$"},
+            "note": {"type": "string", "pattern": "ok"},
+            "day": {"type": "string", "format": "date"},
+            "seen_at": {"type": "string", "format": "date-time"},
+            "id": {"type": "string", "format": "uuid"},
+            "contact": {"type": "string", "format": "email"},
+            "host": {"type": "string", "format": "ipv4"},
+            "site": {"type": "string", "format": "hostname-ish"},
+            "code_a": {"type": "string"},
+            "code_b": {"type": "string", "maxLength": 4}
+        },
+        "patternProperties": {
+            "^code_": {"pattern": "^[a-z]+$", "maxLength": 3}
+        }
+    }
+    '''
+    t = json.loads(test)
+    sm = SchemaModelFactory()
+    sm.register(t)
+
+    from schemamodels.dynamic import PatternSchema
+    ok = dict(sku="ABC-12", note="this is ok", day="2023-02-28", seen_at="2023-02-28T10:00:00Z",
+              id="123e4567-e89b-12d3-a456-426614174000", contact="a@b.dev", host="10.0.0.1",
+              site="anything", code_a="abc", code_b="abc")
+    PatternSchema(**ok)
+    compile_pattern.cache_clear()
+    PatternSchema(**{**ok, "seen_at": "2023-02-28t10:00:00.123+05:30"})
+    assert compile_pattern.cache_info().currsize == 0
+
+    for name, value in (("sku", "ABC-12x"), ("sku", "xABC-12"), ("note", "nope"), ("code_a", "ABC")):
+        with pytest.raises(exceptions.PatternConstraintViolation):
+            PatternSchema(**{**ok, name: value})
+    for name, value in (("day", "2023-02-30"), ("day", "20230228"), ("seen_at", "2023-02-28T10:00:00"),
+                        ("id", "123e4567e89b12d3a456426614174000"), ("contact", "a b@c"), ("host", "10.0.0.256"),
+                        ("host", "10.0.0.01")):
+        with pytest.raises(exceptions.FormatConstraintViolation):
+            PatternSchema(**{**ok, name: value})
+    with pytest.raises(exceptions.LengthConstraintViolation):
+        PatternSchema(**{**ok, "code_a": "abcd"})
+    with pytest.raises(exceptions.SubSchemaFailureViolation):
+        PatternSchema(**{**ok, "code_b": "abcd"})
+
+    assert FORMAT_CHECKERS['ipv6']("::1")
+    is_datetime = FORMAT_CHECKERS['date-time']  # the same answers on every python version
+    for value in ("2023-02-28T10:00:00.5Z", "2023-02-28T10:00:00.1234567-07:00", "2016-12-31T23:59:60Z"):
+        assert is_datetime(value), value
+    for value in ("2023-02-28T10:00:00,5Z", "2023-02-28T100000.5+00:00", "2023-02-28T10:00:00.Z",
+                  "2023-02-28T24:00:00Z", "2023-02-28T10:00:00+0500", "2023-02-28T10:00:00+05:60", "2023-02-28T1０:00:00Z"):
+        assert not is_datetime(value), value
+    assert not FORMAT_CHECKERS['email']("a@b@c") and FORMAT_CHECKERS['email']('"a@b"@c.dev')
+
+
+@pytest.mark.parallel
+def test_validate_many():
+    import pickle
+    test = '''
+    {
+        "title": "parallel-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "rating": {
+              "type": "integer",
+              "minimum": 0
+            },
+            "brand_name": {
+              "type": "string"
+            }
+        }
+    }
+    '''
+    t = json.loads(test)
+    sm = SchemaModelFactory()
+    sm.register(t)
+
+    from schemamodels.dynamic import ParallelSchema
+    assert ParallelSchema.__module__ == 'schemamodels.dynamic'
+    assert pickle.loads(pickle.dumps(ParallelSchema(rating=1))) == ParallelSchema(rating=1)
+
+    records = [{"rating": i if i % 4 else -i, "brand_name": str(i)} for i in range(1, 23)]
+    errors = []
+    results = list(sm.validate_many(records, 'parallel-schema', workers=2, chunksize=3, on_error='collect', errors=errors))
+    assert [r.rating for r in results] == [i for i in range(1, 23) if i % 4]
+    assert all(type(r) is ParallelSchema for r in results)
+    assert [i for i, _ in errors] == [3, 7, 11, 15, 19]
+    assert all(isinstance(err, exceptions.RangeConstraintViolation) for _, err in errors)
+
+    compact = list(sm.validate_many(records[:3], 'ParallelSchema', workers=1, compact=True))
+    assert compact == [r.totuple() for r in results[:3]]
+
+    with pytest.raises(exceptions.RangeConstraintViolation):
+        list(sm.validate_many(records, 'ParallelSchema', workers=2, chunksize=5))
+
+
+@pytest.mark.parallel
+def test_validate_many_spawned(tmp_path, monkeypatch):
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    import multiprocessing
+    import schemamodels
+
+    (tmp_path / 'units.schema.json').write_text(json.dumps({
+        "$id": "https://schema.dev/units.schema.json", "title": "spawned-units", "type": "object",
+        "$defs": {"count": {"type": "integer", "minimum": 0}}, "properties": {"unit": {"type": "string"}}}))
+    (tmp_path / 'order.schema.json').write_text(json.dumps({
+        "title": "spawned-order", "type": "object",
+        "properties": {"n": {"$ref": "https://schema.dev/units.schema.json#/$defs/count"}}}))
+    sm = SchemaModelFactory()
+    sm.load_directory(tmp_path)
+
+    spawned = partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn'))
+    monkeypatch.setattr(schemamodels, 'ProcessPoolExecutor', spawned)
+    errors = []
+    results = list(sm.validate_many([{"n": 1}, {"n": -1}], 'spawned-order', workers=1, on_error='collect', errors=errors))
+    assert [r.n for r in results] == [1]
+    assert [i for i, _ in errors] == [1]
+
+
+@pytest.mark.batch
+def test_avalidate_many():
+    import asyncio
+    test = '''
+    {
+        "title": "async-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "rating": {
+              "type": "integer",
+              "maximum": 5
+            }
+        }
+    }
+    '''
+
+    class CountingRenderer(bases.BaseRenderer):
+        rendered = 0
+
+        @classmethod
+        def apply(cls, f):
+            cls.rendered += 1
+            return f
+
+    t = json.loads(test)
+    sm = SchemaModelFactory(renderer=CountingRenderer)
+    sm.register(t)
+
+    from schemamodels.dynamic import AsyncSchema
+
+    async def arecords():
+        for i in range(10):
+            yield {"rating": i}
+
+    async def ticker(ticks):
+        for _ in range(100):
+            ticks.append(1)
+            await asyncio.sleep(0)
+
+    async def main():
+        ticks, errors = [], []
+        task = asyncio.ensure_future(ticker(ticks))
+        instances = await AsyncSchema.avalidate_many(arecords(), on_error='collect', errors=errors, chunksize=3)
+        seen = len(ticks)
+        task.cancel()
+        offloaded = await AsyncSchema.avalidate_many([{"rating": 1}] * 5, offload=True, chunksize=2)
+        return instances, errors, seen, offloaded
+
+    instances, errors, seen, offloaded = asyncio.run(main())
+    assert [i.rating for i in instances] == list(range(6))
+    assert [i for i, _ in errors] == [6, 7, 8, 9]
+    assert seen >= 3
+    assert len(offloaded) == 5
+    assert CountingRenderer.rendered == 11
+
+    with pytest.raises(exceptions.RangeConstraintViolation):
+        asyncio.run(AsyncSchema.avalidate_many([{"rating": 9}]))
+
+
+@pytest.mark.compiled
+def test_check_and_is_valid():
+    test = '''
+    {
+        "title": "checked-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "required": ["rating", "address"],
+        "properties": {
+            "rating": {"type": "integer", "minimum": 0, "maximum": 5},
+            "brand_name": {"type": "string", "maxLength": 5, "default": "acme"},
+            "address": {
+                "type": "object",
+                "required": ["zip"],
+                "properties": {"zip": {"type": "string", "minLength": 5}}
+            }
+        }
+    }
+    '''
+    sm = SchemaModelFactory()
+    sm.register(json.loads(test))
+    from schemamodels.dynamic import CheckedSchema
+    from schemamodels import LazyMethod
+
+    assert type(vars(CheckedSchema)['check']) is LazyMethod  # not compiled until first used
+    assert CheckedSchema.check(rating=1, address={"zip": "12345"}) == ()
+    assert type(vars(CheckedSchema)['check']) is classmethod
+    assert CheckedSchema.is_valid(rating=1, address={"zip": "12345"})
+    violations = CheckedSchema.check(rating=9, brand_name="too long", address={"zip": "1"}, extra=True)
+    assert set(violations) == {
+        ('extra', 'additionalProperties', True),
+        ('address.zip', 'minLength', '1'),
+        ('rating', 'maximum', 9),
+        ('brand_name', 'maxLength', 'too long'),
+    }
+    assert violations[0].field == 'extra'
+    assert CheckedSchema.check(rating="1") == (('address', 'required', None), ('rating', 'type', '1'))
+    assert CheckedSchema.check(rating=-1, address={"zip": "12345"})[0].keyword == 'minimum'
+
+    for kw in ({"rating": 9, "address": {"zip": "12345"}}, {"rating": 1, "address": {"zip": "1"}},
+               {"rating": "1", "address": {"zip": "12345"}}, {"rating": 1}, {"rating": 1, "address": 1}):
+        assert not CheckedSchema.is_valid(**kw)
+        with pytest.raises((exceptions.SchemaViolation, TypeError)):
+            CheckedSchema(**kw)
+
+
+@pytest.mark.metrics
+def test_metrics():
+    test = '''
+    {
+        "title": "metered-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "rating": {"type": "integer", "minimum": 0, "maximum": 5},
+            "brand_name": {"type": "string", "maxLength": 5}
+        }
+    }
+    '''
+    from schemamodels.metrics import Metrics
+
+    published = []
+    metrics = Metrics(hooks=[published.append], every=4)
+    sm = SchemaModelFactory(metrics=metrics)
+    sm.register(json.loads(test))
+    from schemamodels.dynamic import MeteredSchema
+
+    MeteredSchema(rating=1)
+    MeteredSchema(rating=2, brand_name="acme")
+    for kw in ({"rating": 9}, {"rating": -1}, {"brand_name": "too long"}):
+        with pytest.raises(exceptions.SchemaViolation):
+            MeteredSchema(**kw)
+
+    snapshot = metrics.snapshot()['MeteredSchema']
+    assert (snapshot['built'], snapshot['failed']) == (2, 3)
+    assert snapshot['failures'] == {
+        'RangeConstraintViolation': {'maximum': 1, 'minimum': 1},
+        'LengthConstraintViolation': {'maxLength': 1},
+    }
+    assert snapshot['keywords']['type']['calls'] == 10
+    assert snapshot['keywords']['minimum+maximum']['calls'] == 3
+    assert snapshot['seconds'] > 0
+    assert len(published) == 1 and published[0]['MeteredSchema']['built'] == 2
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+    plain = SchemaModelFactory()
+    plain.register(json.loads(test))
+    from schemamodels.dynamic import MeteredSchema as Plain
+    assert Plain is not MeteredSchema
+    assert '_m' not in Plain.__post_init__.__code__.co_names
+
+
+@pytest.mark.array
+def test_array_keywords():
+    test = '''
+    {
+        "title": "array-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "readings": {"type": "array", "items": {"type": "number", "minimum": 0, "maximum": 1}, "uniqueItems": true},
+            "pair": {"type": "array", "prefixItems": [{"type": "string"}, {"type": "integer"}], "items": false},
+            "tags": {"type": "array", "items": {"type": "string", "enum": ["a", "b"]}, "minItems": 1, "maxItems": 2},
+            "matrix": {"type": "array", "items": {"type": "array", "items": {"type": "integer"}}}
+        }
+    }
+    '''
+    sm = SchemaModelFactory()
+    sm.register(json.loads(test))
+    from schemamodels.dynamic import ArraySchema
+
+    readings = [i / 4096 for i in range(4096)]  # large enough for the vectorized range check
+    ex = ArraySchema(readings=readings, pair=["x", 1], tags=["a"], matrix=[[1, 2], [3]])
+    assert ex.readings == tuple(readings)
+    assert ex.matrix == ((1, 2), (3, ))
+    assert hash(ex) == hash(ArraySchema(readings=tuple(readings), pair=("x", 1), tags=("a", ), matrix=((1, 2), (3, ))))
+
+    validator = validators.Draft202012Validator(json.loads(test))
+    for kw, exc in (
+        ({"readings": readings + [1.5]}, exceptions.ArrayConstraintViolation),
+        ({"readings": [0.5, 0.5]}, exceptions.ArrayConstraintViolation),
+        ({"readings": [0.5, "x"]}, exceptions.ArrayConstraintViolation),
+        ({"pair": ["x", 1, 2]}, exceptions.LengthConstraintViolation),
+        ({"pair": [1]}, exceptions.ArrayConstraintViolation),
+        ({"tags": []}, exceptions.LengthConstraintViolation),
+        ({"tags": ["c"]}, exceptions.ArrayConstraintViolation),
+        ({"tags": ["a"], "matrix": [[1], ["2"]]}, exceptions.ArrayConstraintViolation),
+    ):
+        assert not validator.is_valid(kw)
+        with pytest.raises(exc):
+            ArraySchema(**{"tags": ["a"], **kw})
+
+    assert ArraySchema(tags=["a"], pair=["x"]).pair == ("x", )
+    nan = float('nan')  # fails the bounds wherever it sits, as a scalar number field would
+    for bad in ([0.5, nan], [nan, 0.25], readings + [nan]):
+        assert not ArraySchema.is_valid(tags=["a"], readings=bad)
+        with pytest.raises(exceptions.ArrayConstraintViolation):
+            ArraySchema(tags=["a"], readings=bad)
+
+
+@pytest.mark.columnar
+def test_batch():
+    test = '''
+    {
+        "title": "batch-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "rating": {"type": "integer", "minimum": 0},
+            "score": {"type": "number"},
+            "active": {"type": "boolean"},
+            "code": {"type": "string", "maxLength": 4},
+            "tags": {"type": "array"}
+        }
+    }
+    '''
+    sm = SchemaModelFactory()
+    sm.register(json.loads(test))
+    from schemamodels.dynamic import BatchSchema
+
+    records = [{"rating": i, "score": i / 2, "active": i % 3 == 0, "code": f"c{i}", "tags": [i]} for i in range(20)]
+    batch = BatchSchema.Batch(records)
+    assert len(batch) == 20
+    assert batch[3] == BatchSchema(**records[3])
+    assert batch[-1].tags == (19, )
+    assert list(batch)[5:7] == batch[5:7]
+    with pytest.raises(IndexError):
+        batch[20]
+    with pytest.raises(exceptions.RangeConstraintViolation):
+        batch.append({"rating": -1})
+    assert len(batch) == 20
+
+    np = pytest.importorskip("numpy")
+    structured = batch.tonumpy()
+    assert structured.dtype['rating'] == 'i8' and structured.dtype['code'] == 'U4'
+    assert structured['active'].tolist() == [r["active"] for r in records]
+    assert structured['tags'][4] == (4, )
+    held = batch.column('score')
+    batch.append({"rating": 20, "score": 10.0})  # a held column never blocks appends
+    assert len(held) == 20 and batch.column('score')[-1] == 10.0
+
+    batch.append({"rating": 2 ** 70})
+    assert batch[-1].rating == 2 ** 70
+    assert batch.tonumpy().dtype['rating'] == object
+
+    view = np.frombuffer(batch.columns['score'], dtype='d')  # pins the array, append() can't grow it
+    with pytest.raises(BufferError):
+        batch.append({"rating": 21, "score": 11.0})
+    del view
+    assert len(batch) == 22 and batch[-1].rating == 2 ** 70  # no row was half appended
+    assert [len(c) for c in batch.columns.values()] == [22] * 5
+
+    exact = BatchSchema.Batch([{"rating": 1, "score": 0.5}, {"rating": True, "score": 2}])
+    assert exact[1].rating is True and type(exact[1].score) is int  # not stored as 1 and 2.0
+    assert exact[0] == BatchSchema(rating=1, score=0.5)
+    assert exact.tonumpy().dtype['rating'] == object
+
+
+@pytest.mark.packed
+def test_packed_records(tmp_path):
+    test = '''
+    {
+        "title": "packed-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "rating": {"type": "integer", "minimum": 0},
+            "score": {"type": "number"},
+            "active": {"type": "boolean"},
+            "code": {"type": "string", "maxLength": 4}
+        }
+    }
+    '''
+    sm = SchemaModelFactory()
+    sm.register(json.loads(test))
+    from schemamodels.dynamic import PackedSchema
+
+    ex = PackedSchema(rating=3, score=1.5, active=True, code="ñü")
+    assert PackedSchema.frombytes(ex.tobytes()) == ex
+    assert PackedSchema._layout.decode.__code__.co_filename.startswith('<schemamodels decoder')
+    with pytest.raises(ValueError, match='packed layout'):  # wider than 64 bits
+        PackedSchema(rating=2 ** 64).tobytes()
+    exact = PackedSchema(rating=3, score=1.5, active=False, code="x")
+    assert PackedSchema.frombytes(exact.tobytes()).tojson() == exact.tojson()
+    for kw in ({"rating": True}, {"score": 2}):  # would come back as 1 and 2.0
+        with pytest.raises(ValueError, match='packed layout'):
+            PackedSchema(**kw).tobytes()
+
+    instances = [PackedSchema(rating=i, score=i / 4, active=i % 2 == 0, code=str(i)) for i in range(50)]
+    path = tmp_path / 'records.bin'
+    with open(path, 'wb') as fp:
+        assert PackedSchema.write_records(fp, instances) == 50
+    assert list(PackedSchema.read_records(path)) == instances
+    assert list(PackedSchema.read_records(path, validate=False)) == instances
+
+    bad = PackedSchema(rating=1).tobytes().replace((1).to_bytes(8, 'little'), (-1).to_bytes(8, 'little', signed=True), 1)
+    with pytest.raises(exceptions.RangeConstraintViolation):
+        PackedSchema.frombytes(bad)
+    assert PackedSchema.frombytes(bad, validate=False).rating == -1
+
+    with open(path, 'wb') as fp:
+        PackedSchema.write_records(fp, instances, header=False)
+    with pytest.raises(ValueError):
+        list(PackedSchema.read_records(path, validate=False))
+
+    sm.register({**json.loads(test), "title": "loose-schema", "properties": {"tags": {"type": "array"}}})
+    from schemamodels.dynamic import LooseSchema
+    with pytest.raises(TypeError):
+        LooseSchema().tobytes()
+
+
+@pytest.mark.export
+def test_tojson():
+    import io
+
+    test = '''
+    {
+        "title": "json-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "rating": {"type": "integer"},
+            "score": {"type": "number"},
+            "active": {"type": "boolean"},
+            "brand_name": {"type": "string"},
+            "tags": {"type": "array"},
+            "maker": {"type": "object", "properties": {"name": {"type": "string"}}}
+        }
+    }
+    '''
+    sm = SchemaModelFactory()
+    sm.register(json.loads(test))
+    from schemamodels.dynamic import JsonSchema
+    from schemamodels import LazyMethod
+
+    assert type(vars(JsonSchema)['tojson']) is LazyMethod  # exports compile on first use too
+    for ex in (
+        JsonSchema(rating=3, score=2, active=True, brand_name='café "x"\n', tags=[1, "a", None], maker={"name": "acme"}),
+        JsonSchema(score=float("inf")),
+        JsonSchema(),
+    ):
+        assert ex.tojson() == json.dumps(ex.todict(deep=True), separators=(',', ':'))
+    assert callable(vars(JsonSchema)['tojson']) and JsonSchema.totuple(JsonSchema()) == JsonSchema().totuple()
+
+    buf = io.StringIO()
+    instances = [JsonSchema(rating=i) for i in range(5)]
+    assert JsonSchema.write_ndjson(instances, buf, chunksize=2) == 5
+    assert [JsonSchema(**json.loads(line)) for line in buf.getvalue().splitlines()] == instances
+
+
+@pytest.mark.custom
+def test_trusted_construction():
+    test = '''
+    {
+        "title": "trusted-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "required": ["rating"],
+        "properties": {
+            "rating": {"type": "integer", "minimum": 0},
+            "tags": {"type": "array"},
+            "maker": {"type": "object", "properties": {"name": {"type": "string", "maxLength": 3}}}
+        }
+    }
+    '''
+
+    class CountingRenderer(bases.BaseRenderer):
+        rendered = 0
+
+        @classmethod
+        def apply(cls, f):
+            cls.rendered += 1
+            return f
+
+    sm = SchemaModelFactory(renderer=CountingRenderer)
+    sm.register(json.loads(test))
+    from schemamodels.dynamic import TrustedSchema
+
+    ex = TrustedSchema(rating=1, tags=["a"], maker={"name": "abc"})
+    rendered = CountingRenderer.rendered
+    assert TrustedSchema.trusted(rating=1, tags=["a"], maker={"name": "abc"}) == ex
+    assert TrustedSchema.from_trusted_tuple(ex.totuple()) == ex
+    assert CountingRenderer.rendered == rendered + 4  # parent and nested model, twice
+
+    unchecked = TrustedSchema.trusted(rating=-1, maker={"name": "too long"})
+    assert unchecked.rating == -1 and unchecked.maker.name == "too long"
+    assert unchecked.tags == ()
+    with pytest.raises(TypeError):
+        TrustedSchema.trusted()
+    with pytest.raises(TypeError):
+        TrustedSchema.trusted(rating=1, extra=True)
+
+
+@pytest.mark.compiled
+def test_evolve():
+    test = '''
+    {
+        "title": "evolving-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "rating": {"type": "integer", "minimum": 0, "maximum": 5},
+            "brand_name": {"type": "string", "maxLength": 5},
+            "tags": {"type": "array"},
+            "maker": {"type": "object", "properties": {"name": {"type": "string", "maxLength": 3}}}
+        },
+        "required": ["maker"]
+    }
+    '''
+    sm = SchemaModelFactory()
+    sm.register(json.loads(test))
+    from schemamodels.dynamic import EvolvingSchema
+
+    ex = EvolvingSchema(rating=1, brand_name="acme", maker={"name": "ab"})
+    changed = ex.evolve(rating=2, tags=["a"], maker={"name": "abc"})
+    assert changed == EvolvingSchema(rating=2, brand_name="acme", tags=("a", ), maker={"name": "abc"})
+    assert ex.rating == 1 and ex.tags == ()
+    assert ex.evolve() is ex
+
+    for kw, exc in (
+        ({"rating": 9}, exceptions.RangeConstraintViolation),
+        ({"rating": "9", "brand_name": "too long"}, exceptions.ValueTypeViolation),
+        ({"maker": {"name": "too long"}}, exceptions.LengthConstraintViolation),
+        ({"maker": None}, exceptions.ValueTypeViolation),  # required, so None is not a valid maker
+    ):
+        with pytest.raises(exc):
+            ex.evolve(**kw)
+        with pytest.raises(exc):
+            EvolvingSchema(**{**ex.todict(), **kw})
+    with pytest.raises(TypeError):
+        ex.evolve(unknown=1)
+
+
+@pytest.mark.compiled
+def test_static_compile(tmp_path, monkeypatch, capsys):
+    test = '''
+    {
+        "title": "static-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "required": ["brand_name"],
+        "properties": {
+            "brand_name": {"type": "string", "maxLength": 5, "pattern": "^[a-z]"},
+            "rating": {"type": "integer", "minimum": 0, "exclusiveMaximum": 1e400},
+            "tags": {"type": "array", "items": {"type": "string", "minLength": 1}},
+            "maker": {"type": "object", "properties": {"name": {"type": "string", "enum": ["a", "b"]}}},
+            "note": {"description": "no type keyword"}
+        }
+    }
+    '''
+    (tmp_path / 'static.schema.json').write_text(test)
+    output = tmp_path / 'static_models.py'
+    from schemamodels.__main__ import main
+    assert main(['compile', str(tmp_path), '-o', str(output)]) == 0
+    source = output.read_text()
+    assert 'exec' not in source and 'make_dataclass' not in source
+    capsys.readouterr()
+    assert main(['compile', str(tmp_path / 'static.schema.json')]) == 0
+    assert capsys.readouterr().out == source  # stdout carries the module and nothing else
+    monkeypatch.syspath_prepend(str(tmp_path))
+    static = importlib.import_module('static_models').StaticSchema
+
+    sm = SchemaModelFactory()
+    sm.register(json.loads(test))
+    from schemamodels.dynamic import StaticSchema
+
+    record = {"brand_name": "acme", "rating": 3, "tags": ["x"], "maker": {"name": "a"}}
+    ex = static(**record)
+    assert ex.todict(deep=True) == StaticSchema(**record).todict(deep=True)
+    assert ex.tojson() == StaticSchema(**record).tojson()
+    assert pickle.loads(pickle.dumps(ex)) == ex and not hasattr(ex, '__dict__')
+    with pytest.raises(FrozenInstanceError):
+        ex.rating = 4
+    for kw, exc in (
+        ({"rating": -1}, exceptions.RangeConstraintViolation),
+        ({"brand_name": "Acme"}, exceptions.PatternConstraintViolation),
+        ({"tags": [""]}, exceptions.ArrayConstraintViolation),
+        ({"maker": {"name": "c"}}, exceptions.ValueTypeViolation),
+    ):
+        with pytest.raises(exc):
+            static(**{**record, **kw})
+        assert static.check(**{**record, **kw}) == StaticSchema.check(**{**record, **kw})
+
+
+@pytest.mark.cache
+def test_interned_subschemas():
+    from schemamodels import INTERN_TABLE, ModelCache, compile_predicate
+    from schemamodels.interning import InternTable
+    test = '''
+    {
+        "title": "interned-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "brand_name": {"type": "string", "maxLength": 255, "description": "a name"},
+            "tags": {"type": "array", "items": {"type": "string", "maxLength": 255}},
+            "labels": {"type": "array", "items": {"type": "string", "maxLength": 255}}
+        }
+    }
+    '''
+    before = INTERN_TABLE.stats()
+    SchemaModelFactory(cache=ModelCache()).register(json.loads(test))
+    SchemaModelFactory(cache=ModelCache()).register({**json.loads(test), "title": "interned-copy"})
+    from schemamodels.dynamic import InternedSchema, InternedCopy
+
+    first, second = ({v for v in k.__post_init__.__globals__.values() if getattr(v, '__module__', None) == 'schemamodels.arrays'} for k in (InternedSchema, InternedCopy))
+    assert len(first) == 1 and first == second  # one items checker for both fields of both models
+    assert compile_predicate({"type": "string", "maxLength": 3}) is compile_predicate({"maxLength": 3, "type": "string"})
+    assert compile_predicate({"type": "integer", "enum": [1]}) is not compile_predicate({"type": "integer", "enum": [True]})
+
+    after = INTERN_TABLE.stats()
+    assert after.hits > before.hits and after.bytes_saved > before.bytes_saved
+    assert 0 < after.hit_rate < 1 and after.entries == len(INTERN_TABLE)
+
+    table = InternTable(maxsize=2)
+    a, b = table.get('k', 1, object), table.get('k', 2, object)
+    assert table.get('k', 1, object) is a  # 1 is now the most recent
+    table.get('k', 3, object)
+    assert len(table) == 2 and table.get('k', 1, object) is a and table.get('k', 2, object) is not b
+
+
+@pytest.mark.compiled
+def test_adaptive_combinators():
+    from schemamodels import ModelCache, combinators
+    test = '''
+    {
+        "title": "adaptive-schema",
+        "description": "Blue Blah",
+        "type": "object",
+        "properties": {
+            "tag": {"anyOf": [{"type": "string"}, {"minimum": 0}, {"type": "null"}]},
+            "provider_id": {"type": "integer", "oneOf": [{"multipleOf": 5}, {"multipleOf": 3}, {"multipleOf": 2}]}
+        }
+    }
+    '''
+    sm = SchemaModelFactory(cache=ModelCache(), adaptive=True)
+    sm.register(json.loads(test))
+    from schemamodels.dynamic import AdaptiveSchema
+
+    for _ in range(combinators.REORDER_EVERY):
+        AdaptiveSchema(tag=7, provider_id=3)
+    branches = {c.kind: c for c in AdaptiveSchema.__post_init__.__globals__.values() if isinstance(c, combinators.AdaptiveBranches)}
+    assert branches['anyOf'].order[0] == 1 and branches['oneOf'].order[0] == 1
+    assert AdaptiveSchema(tag="x", provider_id=3).tag == "x"  # the moved-up minimum branch raises TypeError, schema order decides
+    with pytest.raises(exceptions.SubSchemaFailureViolation):
+        AdaptiveSchema(tag=-1, provider_id=3)
+    with pytest.raises(exceptions.SubSchemaFailureViolation):
+        AdaptiveSchema(provider_id=15)
+    assert [v.keyword for v in AdaptiveSchema.check(provider_id=7)] == ['oneOf']
@@ -0,0 +1,12 @@
+# SPDX-FileCopyrightText: 2023 Civic Hacker, LLC
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# Names vulture cannot see being used, picked up by `vulture .`
+
+from schemamodels import dynamic
+from schemamodels.metrics import Metrics
+
+dynamic.__getattr__  # module __getattr__ (PEP 562), called on import
+Metrics.built  # called from the generated, metered __post_init__
+Metrics.failed  # same
+Metrics.add_hook  # public, for registering hooks after construction